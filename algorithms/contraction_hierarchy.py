@@ -0,0 +1,365 @@
+import heapq
+import os
+
+import numpy as np
+
+from graphs.csr_graph import WEIGHT_ATTRS, weight_attr
+
+# Relative slack under which two route costs count as equal (float sums of the same roads)
+TIE_TOLERANCE = 1e-9
+
+
+class ContractionHierarchy:
+    """
+    Contraction Hierarchy for one weight attribute of an undirected CSRGraph.
+    Preprocessing contracts nodes in edge-difference order and adds shortcut edges;
+    the result is an "upward" CSR graph (each node -> higher-ranked neighbors) where
+    up_middle[k] is the contracted node a shortcut bypasses, or -1 for a road, and
+    up_tie[k] marks edges that stand for more than one route of the same cost.
+    Queries run a Dijkstra upward from both ends (with stall-on-demand) and meet at the
+    top; among equal-cost routes they return the one PathFinder.dijkstra would (see _canonical).
+    """
+
+    def __init__(self, node_ids, rank, up_indptr, up_indices, up_weights, up_middle, up_tie=None,
+                 attr="weight", version=0):
+        self.node_ids = list(node_ids)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.attr = attr
+        self.version = version
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.up_indptr = np.asarray(up_indptr, dtype=np.int64)
+        self.up_indices = np.asarray(up_indices, dtype=np.int64)
+        self.up_weights = np.asarray(up_weights, dtype=np.float64)
+        self.up_middle = np.asarray(up_middle, dtype=np.int64)
+        # Hierarchies saved without tie flags treat every edge as tied, which is slower but exact
+        self.up_tie = (np.ones(len(self.up_indices), dtype=bool) if up_tie is None
+                       else np.asarray(up_tie, dtype=bool))
+        # Plain lists for the query loops, and (lower, higher) -> middle for unpacking
+        self._indptr = self.up_indptr.tolist()
+        self._indices = self.up_indices.tolist()
+        self._weights = self.up_weights.tolist()
+        self._rank = self.rank.tolist()
+        self._middle = {}
+        self._ties = set()
+        # Roads in both directions (every road that can lie on a shortest path), for tie-breaking
+        self._roads = [[] for _ in self.node_ids]
+        for u in range(len(self.node_ids)):
+            for k in range(self._indptr[u], self._indptr[u + 1]):
+                v = self._indices[k]
+                if self.up_tie[k]:
+                    self._ties.add((u, v))
+                if self.up_middle[k] >= 0:
+                    self._middle[(u, v)] = int(self.up_middle[k])
+                else:
+                    self._roads[u].append((v, self._weights[k]))
+                    self._roads[v].append((u, self._weights[k]))
+
+    @classmethod
+    def build(cls, csr, attr="weight", witness_settle_limit=60):
+        n = csr.number_of_nodes()
+        indptr, indices, weights = csr.lists(attr)
+        adj = [{} for _ in range(n)]  # node -> {neighbor: (weight, middle, tie)}
+        for u in range(n):
+            for k in range(indptr[u], indptr[u + 1]):
+                v, w = indices[k], weights[k]
+                if v != u and (v not in adj[u] or w < adj[u][v][0]):
+                    adj[u][v] = (w, -1, False)
+
+        def shortcuts(v):
+            # Pairs of neighbors with no strictly shorter connection than the one through v;
+            # equal-cost witnesses still get the shortcut so queries can see the tie
+            needed = []
+            nbrs = list(adj[v].items())
+            for i, (u, (wu, _, tu)) in enumerate(nbrs):
+                targets = {x: wu + wx for x, (wx, _, _) in nbrs[i + 1:]}
+                if not targets:
+                    continue
+                found = witness(u, v, max(targets.values()), targets)
+                for x, cost in targets.items():
+                    if found.get(x, float('inf')) > cost - TIE_TOLERANCE * max(cost, 1.0):
+                        needed.append((u, x, cost, tu or adj[v][x][2]))
+            return needed
+
+        def witness(source, skip, limit, targets):
+            dist = {source: 0}
+            pq = [(0, source)]
+            settled = 0
+            remaining = set(targets)
+            while pq and remaining and settled < witness_settle_limit:
+                d, u = heapq.heappop(pq)
+                if d > dist[u]:
+                    continue
+                if d > limit:
+                    break
+                settled += 1
+                remaining.discard(u)
+                for x, (w, _, _) in adj[u].items():
+                    if x == skip:
+                        continue
+                    alt = d + w
+                    if alt < dist.get(x, float('inf')):
+                        dist[x] = alt
+                        heapq.heappush(pq, (alt, x))
+            return dist
+
+        depth = [0] * n
+
+        def priority(v):
+            return len(shortcuts(v)) - len(adj[v]) + depth[v]
+
+        heap = [(priority(v), v) for v in range(n)]
+        heapq.heapify(heap)
+        rank = [0] * n
+        up = [None] * n
+        order = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            # Lazy update: re-evaluate and defer if v is no longer the cheapest
+            p = priority(v)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+            for u, x, cost, tie in shortcuts(v):
+                old = adj[u].get(x)
+                slack = TIE_TOLERANCE * max(cost, 1.0)
+                if old is None or cost < old[0] - slack:
+                    adj[u][x] = adj[x][u] = (cost, v, tie)
+                elif cost <= old[0] + slack:
+                    # One edge now stands for two equal-cost routes; the old one is kept so no
+                    # road on a shortest route drops out of the hierarchy
+                    adj[u][x] = adj[x][u] = (old[0], old[1], True)
+            rank[v] = order
+            order += 1
+            up[v] = [(u, w, m, tie) for u, (w, m, tie) in adj[v].items()]
+            for u in adj[v]:
+                del adj[u][v]
+                depth[u] = max(depth[u], depth[v] + 1)
+            adj[v] = {}
+
+        up_indptr = [0]
+        up_indices, up_weights, up_middle, up_tie = [], [], [], []
+        for v in range(n):
+            for u, w, m, tie in up[v]:
+                up_indices.append(u)
+                up_weights.append(w)
+                up_middle.append(m)
+                up_tie.append(tie)
+            up_indptr.append(len(up_indices))
+        return cls(csr.node_ids, rank, up_indptr, up_indices, up_weights, up_middle, up_tie,
+                   attr=attr, version=csr.version)
+
+    def _unpack(self, a, b, out):
+        # Append the road-level nodes after a on the a -> b edge (a excluded, b included)
+        stack = [(a, b)]
+        while stack:
+            x, y = stack.pop()
+            key = (x, y) if self.rank[x] < self.rank[y] else (y, x)
+            m = self._middle.get(key, -1)
+            if m < 0:
+                out.append(y)
+            else:
+                stack.append((m, y))
+                stack.append((x, m))
+
+    def _distance(self, up, memo, x):
+        # Distance from the root of the upward labels `up` to x, PHAST-style: nodes are swept
+        # from the top rank down, each taking the best of up[node] and distance(higher node) +
+        # weight over its upward edges. Exact whenever the labels are exact along the upward
+        # part of a shortest route to x. Only x's upward closure is swept; results are memoized.
+        if x in memo:
+            return memo[x]
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        todo, stack = {x}, [x]
+        while stack:
+            u = stack.pop()
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                if v not in memo and v not in todo:
+                    todo.add(v)
+                    stack.append(v)
+        for u in sorted(todo, key=self._rank.__getitem__, reverse=True):
+            best = up.get(u, float('inf'))
+            for k in range(indptr[u], indptr[u + 1]):
+                d = memo[indices[k]] + weights[k]
+                if d < best:
+                    best = d
+            memo[u] = best
+        return memo[x]
+
+    def _canonical(self, s, t, best, from_t):
+        """
+        The route PathFinder.dijkstra settles on between dense nodes s and t when equal-cost
+        routes exist: Dijkstra keeps, for each node, the first predecessor reaching its final
+        distance in (distance, index) order. It reruns over the nodes within rounding of a
+        shortest route (those are the only ones that decide its choices), so the result and
+        distance match it exactly. from_t are the query's labels from t: every node on the
+        upward part of a route from t within best was settled, so they are exact there.
+        """
+        tol = TIE_TOLERANCE * max(best, 1.0)
+        memo_t = {}
+        dist = {s: 0}
+        prev = {s: -1}
+        pq = [(0, s)]
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            if u == t:
+                break
+            for v, w in self._roads[u]:
+                alt = d + w
+                if alt >= dist.get(v, float('inf')):
+                    continue
+                to_t = memo_t[v] if v in memo_t else self._distance(from_t, memo_t, v)
+                # Skips relaxations off every near-shortest route: they never decide dist or prev
+                if alt + to_t <= best + 2 * tol:
+                    dist[v] = alt
+                    prev[v] = u
+                    heapq.heappush(pq, (alt, v))
+        path = []
+        v = t
+        while v != -1:
+            path.append(v)
+            v = prev[v]
+        return dist[t], path[::-1]
+
+    def query(self, source, target):
+        """(distance, path) between two node IDs; (inf, []) if unreachable."""
+        s, t = self.index[source], self.index[target]
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        dist = ({s: 0}, {t: 0})
+        prev = ({s: -1}, {t: -1})
+        heaps = ([(0, s)], [(0, t)])
+        # Nodes reached by two equal-cost upward routes, per side, and whether two meeting
+        # nodes tie for best: the only ways the search can see a second shortest route
+        tied = (set(), set())
+        meet_tie = False
+        best, meet = (0, s) if s == t else (float('inf'), -1)
+        limit = best
+        side = 0
+        # Alternate the two upward searches; a side stops once its smallest key can't reach best
+        # (keys equal to best still run, so zero-cost roads and routes meeting at s or t tie too)
+        while (heaps[0] and heaps[0][0][0] <= limit) or (heaps[1] and heaps[1][0][0] <= limit):
+            if not (heaps[side] and heaps[side][0][0] <= limit):
+                side = 1 - side
+            d, u = heapq.heappop(heaps[side])
+            mine, other = dist[side], dist[1 - side]
+            if d > mine[u]:
+                side = 1 - side
+                continue
+            # Stall-on-demand: a higher neighbor already reaches u more cheaply, so d is not
+            # u's distance and nothing relaxed from u can be on a shortest route
+            slack = TIE_TOLERANCE * max(d, 1.0)
+            stalled = False
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                if v in mine and mine[v] + weights[k] < d - slack:
+                    stalled = True
+                    break
+            if stalled:
+                side = 1 - side
+                continue
+            if u in other:
+                cost = d + other[u]
+                if cost < best - slack:
+                    best, meet, meet_tie = cost, u, False
+                elif cost <= best + slack and u != meet:
+                    meet_tie = True
+                    if cost < best:
+                        best, meet = cost, u
+                limit = best + TIE_TOLERANCE * max(best, 1.0)
+            ties = tied[side]
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                alt = d + weights[k]
+                cur = mine.get(v, float('inf'))
+                if alt < cur:
+                    mine[v] = alt
+                    prev[side][v] = u
+                    heapq.heappush(heaps[side], (alt, v))
+                    if cur - alt <= slack:
+                        ties.add(v)
+                    else:
+                        ties.discard(v)
+                elif alt - cur <= slack:
+                    ties.add(v)
+            side = 1 - side
+        if meet < 0:
+            return float('inf'), []
+        fprev, bprev = prev
+
+        tie = meet_tie
+        up_path = []
+        v = meet
+        while v != -1:
+            up_path.append(v)
+            tie = tie or v in tied[0]
+            v = fprev[v]
+        up_path.reverse()
+        v = bprev[meet]
+        tie = tie or meet in tied[1]
+        while v != -1:
+            up_path.append(v)
+            tie = tie or v in tied[1]
+            v = bprev[v]
+
+        path = [up_path[0]]
+        for a, b in zip(up_path, up_path[1:]):
+            tie = tie or ((a, b) if self._rank[a] < self._rank[b] else (b, a)) in self._ties
+            self._unpack(a, b, path)
+        if tie:
+            best, path = self._canonical(s, t, best, dist[1])
+        return best, [self.node_ids[i] for i in path]
+
+    def shortest_path(self, source, target):
+        # Same format as PathFinder.dijkstra: an unreachable target yields [target]
+        _, path = self.query(source, target)
+        return path if path else [target]
+
+    def save(self, path):
+        np.savez(
+            path,
+            node_ids=np.array([str(n) for n in self.node_ids]),
+            rank=self.rank, up_indptr=self.up_indptr, up_indices=self.up_indices,
+            up_weights=self.up_weights, up_middle=self.up_middle, up_tie=self.up_tie,
+            attr=np.array(self.attr), version=np.array(self.version),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(
+                f["node_ids"].tolist(), f["rank"], f["up_indptr"], f["up_indices"],
+                f["up_weights"], f["up_middle"], f["up_tie"] if "up_tie" in f else None,
+                attr=str(f["attr"]), version=int(f["version"]),
+            )
+
+
+class HierarchyRouter:
+    """One ContractionHierarchy per time period behind PathFinder's dijkstra method names."""
+
+    def __init__(self, hierarchies):
+        self.hierarchies = hierarchies  # attr -> ContractionHierarchy
+
+    @classmethod
+    def build(cls, csr, attrs=WEIGHT_ATTRS):
+        return cls({attr: ContractionHierarchy.build(csr, attr) for attr in attrs})
+
+    def dijkstra(self, source, target):
+        return self.hierarchies["weight"].shortest_path(source, target)
+
+    def dijkstra_time_variant(self, source, target, time_period="morning"):
+        return self.hierarchies[weight_attr(time_period)].shortest_path(source, target)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for attr, ch in self.hierarchies.items():
+            ch.save(os.path.join(directory, f"{attr}.npz"))
+
+    @classmethod
+    def load(cls, directory):
+        hierarchies = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".npz"):
+                hierarchies[name[:-len(".npz")]] = ContractionHierarchy.load(os.path.join(directory, name))
+        return cls(hierarchies)
@@ -0,0 +1,240 @@
+import heapq
+import time
+
+import numpy as np
+
+from graphs.csr_graph import period_of, weight_attr
+from algorithms.path_cache import PathCache
+from algorithms.path_finder import PathFinder
+
+
+class DynamicShortestPathTree:
+    """
+    Shortest-path tree from one source over a CSRGraph that is repaired in place when edge
+    weights change (GraphBuilder.apply_traffic patches the CSR view, then calls apply_changes):
+    - raised weights: only the subtrees hanging below a raised tree edge are reset and
+      re-settled from their unaffected boundary
+    - lowered weights: a Dijkstra wave starts at the lowered edges and runs only while it
+      improves distances
+    Parents follow the tie rule of a fresh PathFinder Dijkstra (lowest (dist[u] + w, dist[u], u)
+    over the neighbors), so dist, prev and routes are identical to a recomputation for
+    positive weights.
+    """
+
+    def __init__(self, csr, source, attr="weight"):
+        self.csr = csr
+        self.source = source
+        self.attr = attr
+        self.repairs = 0
+        self.last_repair = None
+        self.rebuild()
+
+    def rebuild(self):
+        finder = PathFinder(self.csr, PathCache(max_entries=0))
+        dist, prev = finder.shortest_path_tree(self.source, period_of(self.attr))
+        self.dist = dist.tolist()
+        self.prev = prev.tolist()
+        self.children = [set() for _ in self.dist]
+        for v, p in enumerate(self.prev):
+            if p != -1:
+                self.children[p].add(v)
+        self.version = self.csr.version
+
+    def apply_changes(self, changes, old_version, new_version):
+        """GraphBuilder listener: repair the tree for the changes to its weight attribute."""
+        started = time.time()
+        relevant = [c for c in changes if c.attr == self.attr]
+        if self.version != old_version or self.csr.version != new_version:
+            # Missed a change set or the view was rebuilt rather than patched
+            self.rebuild()
+            report = {"changes": len(relevant), "raised": 0, "lowered": 0,
+                      "touched": len(self.dist), "changed": len(self.dist), "full": True}
+        elif relevant:
+            report = self._repair(relevant)
+            self.version = new_version
+        else:
+            self.version = new_version
+            report = {"changes": 0, "raised": 0, "lowered": 0, "touched": 0, "changed": 0, "full": False}
+        report["ms"] = (time.time() - started) * 1000
+        self.repairs += 1
+        self.last_repair = report
+        return report
+
+    def _arcs(self, a, b):
+        indptr, indices, _ = self.csr.lists(self.attr)
+        i, j = self.csr.index[a], self.csr.index[b]
+        return i, j, [k for k in range(indptr[i], indptr[i + 1]) if indices[k] == j]
+
+    def _repair(self, changes):
+        indptr, indices, weights = self.csr.lists(self.attr)
+        dist, prev = self.dist, self.prev
+        before = {}
+
+        # The CSR already carries the new weights; the raise phase still sees lowered arcs
+        # at their old weight so the two phases stay separate
+        held, raised, lowered_arcs = {}, [], []
+        for u, v, _, old, new in changes:
+            for a, b in ((u, v), (v, u)):
+                i, j, arcs = self._arcs(a, b)
+                if old is not None and new > old:
+                    raised.append((i, j))
+                else:
+                    lowered_arcs.extend((i, k) for k in arcs)
+                    if old is not None:
+                        held.update((k, old) for k in arcs)
+
+        # Raise phase: reset the subtrees below raised tree edges
+        reset = []
+        in_reset = set()
+        for i, j in raised:
+            if prev[j] == i and j not in in_reset:
+                stack = [j]
+                while stack:
+                    x = stack.pop()
+                    if x not in in_reset:
+                        in_reset.add(x)
+                        reset.append(x)
+                        stack.extend(self.children[x])
+        pq = []
+        for x in reset:
+            before.setdefault(x, (dist[x], prev[x]))
+            dist[x] = float('inf')
+        for x in reset:
+            best = float('inf')
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                if y not in in_reset:
+                    alt = dist[y] + held.get(k, weights[k])
+                    if alt < best:
+                        best = alt
+            if best < float('inf'):
+                dist[x] = best
+                heapq.heappush(pq, (best, x))
+        while pq:
+            d, x = heapq.heappop(pq)
+            if d > dist[x]:
+                continue
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                if y in in_reset:
+                    alt = d + held.get(k, weights[k])
+                    if alt < dist[y]:
+                        dist[y] = alt
+                        heapq.heappush(pq, (alt, y))
+
+        # Lower phase: propagate improvements from the lowered arcs at their new weights
+        lowered = set()
+        for i, k in lowered_arcs:
+            j = indices[k]
+            alt = dist[i] + weights[k]
+            if alt < dist[j]:
+                before.setdefault(j, (dist[j], prev[j]))
+                dist[j] = alt
+                lowered.add(j)
+                heapq.heappush(pq, (alt, j))
+        while pq:
+            d, x = heapq.heappop(pq)
+            if d > dist[x]:
+                continue
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                alt = d + weights[k]
+                if alt < dist[y]:
+                    before.setdefault(y, (dist[y], prev[y]))
+                    dist[y] = alt
+                    lowered.add(y)
+                    heapq.heappush(pq, (alt, y))
+
+        # Re-pick parents wherever a distance or an incident weight changed
+        check = set(before)
+        for x in before:
+            check.update(indices[indptr[x]:indptr[x + 1]])
+        for u, v, _, _, _ in changes:
+            check.add(self.csr.index[u])
+            check.add(self.csr.index[v])
+        s = self.csr.index[self.source]
+        for x in check:
+            if x == s:
+                continue
+            best, parent = (float('inf'), float('inf'), -1), -1
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                rank = (dist[y] + weights[k], dist[y], y)
+                if rank < best:
+                    best, parent = rank, y
+            if dist[x] == float('inf'):
+                parent = -1
+            if parent != prev[x]:
+                before.setdefault(x, (dist[x], prev[x]))
+                if prev[x] != -1:
+                    self.children[prev[x]].discard(x)
+                if parent != -1:
+                    self.children[parent].add(x)
+                prev[x] = parent
+
+        return {
+            "changes": len(changes),
+            "raised": len(reset),
+            "lowered": len(lowered),
+            "touched": len(check | in_reset),
+            "changed": sum(1 for x, old in before.items() if old != (dist[x], prev[x])),
+            "full": False,
+        }
+
+    def distance(self, target):
+        return self.dist[self.csr.index[target]]
+
+    def path(self, target):
+        node_ids = self.csr.node_ids
+        route = []
+        node = self.csr.index[target]
+        while node != -1:
+            route.append(node_ids[node])
+            node = self.prev[node]
+        return route[::-1]
+
+    def arrays(self):
+        """(dist, prev) NumPy arrays, as PathFinder.shortest_path_tree returns them."""
+        return np.array(self.dist), np.array(self.prev, dtype=np.int64)
+
+
+class DynamicRouter:
+    """
+    Keeps DynamicShortestPathTrees for the most used (source, time period) pairs, up to
+    max_trees (least used evicted first), and repairs all of them on every change set.
+    Register with builder.add_listener(router.apply_changes).
+    """
+
+    def __init__(self, csr, max_trees=16):
+        self.csr = csr
+        self.max_trees = max_trees
+        self.trees = {}  # (source, attr) -> DynamicShortestPathTree
+        self.uses = {}  # (source, attr) -> queries so far
+        self.repairs = []  # one report per repaired tree and change set
+
+    def tree(self, source, time_period=None):
+        attr = weight_attr(time_period)
+        key = (source, attr)
+        self.uses[key] = self.uses.get(key, 0) + 1
+        if key not in self.trees:
+            if len(self.trees) >= self.max_trees:
+                coldest = min(self.trees, key=self.uses.get)
+                if self.uses[coldest] > self.uses[key]:
+                    return DynamicShortestPathTree(self.csr, source, attr)
+                del self.trees[coldest]
+            self.trees[key] = DynamicShortestPathTree(self.csr, source, attr)
+        return self.trees[key]
+
+    def route(self, source, target, time_period=None):
+        return self.tree(source, time_period).path(target)
+
+    def distance(self, source, target, time_period=None):
+        return self.tree(source, time_period).distance(target)
+
+    def apply_changes(self, changes, old_version, new_version):
+        reports = []
+        for (source, attr), tree in self.trees.items():
+            report = tree.apply_changes(changes, old_version, new_version)
+            reports.append({"source": source, "attr": attr, "version": new_version, **report})
+        self.repairs.extend(reports)
+        return reports
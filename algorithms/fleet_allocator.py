@@ -0,0 +1,120 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+# Passengers a single vehicle can carry per day, before diminishing returns set in
+VEHICLE_CAPACITY = {"bus": 1200, "metro": 25000}
+
+
+class FleetAllocator:
+    """
+    Integer fleet sizes for every bus route and metro line under separate bus and metro budgets.
+    A route with daily demand D served by c vehicles captures D * (1 - exp(-k * c / D)), k being
+    the per-vehicle capacity of its mode: concave, so each extra vehicle is worth less than the one
+    before. The two budgets never share vehicles, so each mode is solved on its own with a
+    marginal-gain heap; the fractional relaxation of the same heap bounds the optimum.
+    """
+
+    def __init__(self, routes_df, vehicle_capacity=None):
+        # routes_df: route_id, mode, demand, optional unit_cost (budget units per vehicle),
+        # optional max_vehicles
+        self.routes = routes_df.reset_index(drop=True)
+        self.capacity = dict(VEHICLE_CAPACITY, **(vehicle_capacity or {}))
+
+    @classmethod
+    def from_data(cls, bus_routes_df, metro_lines_df, vehicle_capacity=None):
+        buses = pd.DataFrame({
+            "route_id": bus_routes_df["route_id"],
+            "mode": "bus",
+            "demand": bus_routes_df["daily_passengers"].astype(float),
+            "current": bus_routes_df["buses"],
+        })
+        metro = pd.DataFrame({
+            "route_id": metro_lines_df["line_id"],
+            "mode": "metro",
+            "demand": metro_lines_df["daily_passengers"].astype(float),
+            "current": np.nan,
+        })
+        return cls(pd.concat([buses, metro], ignore_index=True), vehicle_capacity)
+
+    def captured(self, vehicles):
+        """Demand captured per route for an array of fleet sizes (same order as routes)."""
+        demand = self.routes["demand"].to_numpy(dtype=float)
+        k = self.routes["mode"].map(self.capacity).to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = 1 - np.exp(-k * np.asarray(vehicles, dtype=float) / demand)
+        return np.where(demand > 0, demand * share, 0.0)
+
+    def _solve_mode(self, rows, budget):
+        # Greedy on marginal gain per budget unit; returns (vehicles per row, upper bound)
+        demand = self.routes["demand"].to_numpy(dtype=float)[rows]
+        k = self.routes["mode"].map(self.capacity).to_numpy(dtype=float)[rows]
+        unit = (self.routes["unit_cost"].to_numpy(dtype=float)[rows]
+                if "unit_cost" in self.routes else np.ones(len(rows)))
+        if "max_vehicles" in self.routes:
+            limit = self.routes["max_vehicles"].fillna(np.inf).to_numpy(dtype=float)[rows]
+        else:
+            limit = np.full(len(rows), np.inf)
+        # Gain of the (c+1)-th vehicle: D*e^(-kc/D)*(1-e^(-k/D)) = first * decay**c
+        with np.errstate(divide="ignore", invalid="ignore"):
+            decay = np.where(demand > 0, np.exp(-k / np.where(demand > 0, demand, 1)), 0.0)
+        first = demand * (1 - decay)
+        first_l, decay_l, unit_l, limit_l = first.tolist(), decay.tolist(), unit.tolist(), limit.tolist()
+
+        vehicles = [0] * len(rows)
+        heap = [(-g / u, i) for i, (g, u) in enumerate(zip(first_l, unit_l)) if g > 0 and limit_l[i] > 0]
+        heapq.heapify(heap)
+        left = budget
+        bound = None
+        gained = 0.0
+        while heap:
+            ratio, i = heapq.heappop(heap)
+            if unit_l[i] > left:
+                # Can't afford this route any more; the bound still takes it fractionally
+                if bound is None:
+                    bound = gained + left * -ratio
+                continue
+            vehicles[i] += 1
+            left -= unit_l[i]
+            gained += -ratio * unit_l[i]
+            if vehicles[i] < limit_l[i]:
+                heapq.heappush(heap, (ratio * decay_l[i], i))
+        if bound is None:
+            bound = gained  # greedy never hit the budget edge: it is optimal
+        return np.array(vehicles, dtype=np.int64), bound
+
+    def allocate(self, bus_budget, metro_budget):
+        """
+        Fleet size per route plus the optimality gap: {"allocation", "captured",
+        "upper_bound", "gap", "gap_pct"}. With unit vehicle costs the greedy is exact (gap 0).
+        When routes carry a `current` fleet, the allocation also reports the change per route
+        and "current_captured" / "captured_gain" compare against it over those routes only.
+        """
+        vehicles = np.zeros(len(self.routes), dtype=np.int64)
+        bound = 0.0
+        for mode, budget in (("bus", bus_budget), ("metro", metro_budget)):
+            rows = np.flatnonzero(self.routes["mode"].to_numpy() == mode)
+            if len(rows):
+                vehicles[rows], mode_bound = self._solve_mode(rows, budget)
+                bound += mode_bound
+        captured = self.captured(vehicles)
+        allocation = self.routes.assign(vehicles=vehicles, captured=captured)
+        total = float(captured.sum())
+        gap = max(bound - total, 0.0)
+        result = {
+            "allocation": allocation,
+            "captured": total,
+            "upper_bound": max(bound, total),
+            "gap": gap,
+            "gap_pct": float(gap / bound) if bound > 0 else 0.0,
+        }
+        if "current" in self.routes:
+            current = self.routes["current"].to_numpy(dtype=float)
+            known = ~np.isnan(current)
+            current_captured = np.where(known, self.captured(np.nan_to_num(current)), np.nan)
+            result["allocation"] = allocation.assign(change=vehicles - current,
+                                                     current_captured=current_captured)
+            result["current_captured"] = float(current_captured[known].sum())
+            result["captured_gain"] = float(captured[known].sum()) - result["current_captured"]
+        return result
@@ -0,0 +1,125 @@
+import bisect
+
+import pandas as pd
+
+from graphs.csr_graph import CSRGraph, weight_attr
+
+
+class GreenWavePlanner:
+    """
+    Signal pre-emption along emergency routes: each signalized intersection on a route (from
+    PathFinder.a_star_time_variant) turns green for the vehicle's approach from lead_s before
+    its expected arrival until clearance_s after it, so the vehicle rides a green wave.
+    Windows are kept per intersection in start order. When two vehicles need the same
+    intersection from different approaches at overlapping times, the higher priority (or,
+    on equal priority, the earlier dispatch) keeps its window; the other is held until the
+    intersection clears, and that delay carries on to the rest of its route.
+    """
+
+    def __init__(self, finder, speed_kmh=60, lead_s=15, clearance_s=10, signals=None):
+        self.finder = finder
+        self.G = finder.G
+        self.speed_kmh = speed_kmh
+        self.lead_s = lead_s
+        self.clearance_s = clearance_s
+        self.signals = set(signals) if signals is not None else self._intersections()
+        self.reservations = {}  # node -> sorted [(start, end, order, vehicle_id, approach)]
+        self.vehicles = {}  # vehicle_id -> {"route", "priority", "depart", "order", "stops", "windows", "delay"}
+        self._order = 0
+
+    def _intersections(self):
+        if isinstance(self.G, CSRGraph):
+            indptr = self.G.indptr
+            return {node for i, node in enumerate(self.G.node_ids) if indptr[i + 1] - indptr[i] >= 3}
+        return {node for node in self.G.nodes if self.G.degree(node) >= 3}
+
+    def _edge_weight(self, u, v, attr):
+        if isinstance(self.G, CSRGraph):
+            indptr, indices, weights = self.G.lists(attr)
+            i, j = self.G.index[u], self.G.index[v]
+            return min(weights[k] for k in range(indptr[i], indptr[i + 1]) if indices[k] == j)
+        return self.G[u][v].get(attr, 1)
+
+    def arrivals(self, route, time_period=None):
+        """Seconds from departure to each node of the route, from the (period) edge weights in km."""
+        attr = weight_attr(time_period)
+        times = [0.0]
+        for u, v in zip(route, route[1:]):
+            times.append(times[-1] + self._edge_weight(u, v, attr) / self.speed_kmh * 3600)
+        return times
+
+    def dispatch(self, vehicle_id, source, target, pos, depart=0.0, priority=1, time_period="morning"):
+        """Route with time-variant A* and reserve its green wave; returns the windows."""
+        route = self.finder.a_star_time_variant(source, target, pos, time_period)
+        return self.add_vehicle(vehicle_id, route, depart=depart, priority=priority, time_period=time_period)
+
+    def add_vehicle(self, vehicle_id, route, depart=0.0, priority=1, time_period=None):
+        if vehicle_id in self.vehicles:
+            self.remove_vehicle(vehicle_id)
+        times = self.arrivals(route, time_period)
+        self._order += 1
+        self.vehicles[vehicle_id] = {
+            "route": list(route), "priority": priority, "depart": depart, "order": self._order,
+            "stops": [(route[k], route[k - 1], times[k]) for k in range(1, len(route)) if route[k] in self.signals],
+            "windows": [], "delay": 0.0,
+        }
+        self._schedule(vehicle_id)
+        return self.windows(vehicle_id)
+
+    def remove_vehicle(self, vehicle_id):
+        info = self.vehicles.pop(vehicle_id)
+        self._release(vehicle_id, info)
+
+    def _release(self, vehicle_id, info):
+        for node, start, end, approach in info["windows"]:
+            slots = self.reservations[node]
+            slots.pop(bisect.bisect_left(slots, (start, end, info["order"], vehicle_id, approach)))
+        info["windows"] = []
+
+    def _outranks(self, a, b):
+        return (a["priority"], -a["order"]) > (b["priority"], -b["order"])
+
+    def _schedule(self, vehicle_id):
+        info = self.vehicles[vehicle_id]
+        window = self.lead_s + self.clearance_s
+        delay = 0.0
+        bumped = set()
+        for node, approach, arrival in info["stops"]:
+            slots = self.reservations.setdefault(node, [])
+            while True:
+                start = info["depart"] + arrival + delay - self.lead_s
+                end = start + window
+                # Every window has the same length, so only those starting within one of it can overlap
+                lo, hi = bisect.bisect_right(slots, (start - window,)), bisect.bisect_left(slots, (end,))
+                conflicts = [s for s in slots[lo:hi] if s[1] > start and s[4] != approach]
+                blocking = [s for s in conflicts if not self._outranks(info, self.vehicles[s[3]])]
+                if blocking:
+                    delay += max(s[1] for s in blocking) - start
+                    continue
+                bumped.update(s[3] for s in conflicts)
+                break
+            info["windows"].append((node, start, end, approach))
+        for node, start, end, approach in info["windows"]:
+            bisect.insort(self.reservations[node], (start, end, info["order"], vehicle_id, approach))
+        info["delay"] = delay
+
+        # Lower-priority vehicles that lost their slot are re-planned behind this one
+        for other in sorted(bumped, key=lambda v: (-self.vehicles[v]["priority"], self.vehicles[v]["order"])):
+            self._release(other, self.vehicles[other])
+        for other in sorted(bumped, key=lambda v: (-self.vehicles[v]["priority"], self.vehicles[v]["order"])):
+            self._schedule(other)
+
+    def windows(self, vehicle_id):
+        info = self.vehicles[vehicle_id]
+        return pd.DataFrame(
+            [(vehicle_id, node, approach, start + self.lead_s, start, end)
+             for node, start, end, approach in info["windows"]],
+            columns=["vehicle_id", "intersection", "approach_from", "arrival_s", "green_start_s", "green_end_s"],
+        )
+
+    def signal_plan(self, node):
+        """Pre-emption windows reserved at one intersection, in time order."""
+        return pd.DataFrame(
+            [(vehicle_id, approach, start, end) for start, end, _, vehicle_id, approach in self.reservations.get(node, [])],
+            columns=["vehicle_id", "approach_from", "green_start_s", "green_end_s"],
+        )
@@ -0,0 +1,83 @@
+import numpy as np
+
+from graphs.csr_graph import WEIGHT_ATTRS, period_of
+from algorithms.path_cache import PathCache
+from algorithms.path_finder import PathFinder
+
+
+class LandmarkIndex:
+    """
+    ALT (A*, Landmarks, Triangle inequality) lower bounds for a CSRGraph.
+    For landmark L and any nodes v, t: dist(v, t) >= |dist(L, t) - dist(L, v)|, so the
+    max over landmarks is an admissible, consistent A* heuristic. Distances are
+    precomputed per weight attribute (plain weight and each time period).
+    """
+
+    def __init__(self, csr, landmarks, distances):
+        self.csr = csr
+        self.landmarks = list(landmarks)  # dense node indices
+        self.distances = distances  # attr -> (len(landmarks), n) float array
+        self._columns = {}
+
+    @classmethod
+    def build(cls, csr, count=8, attrs=WEIGHT_ATTRS):
+        finder = PathFinder(csr, PathCache(max_entries=0))
+        n = csr.number_of_nodes()
+        rows = {attr: [] for attr in attrs}
+        landmarks = []
+        # Farthest selection on the plain weight: each new landmark is the node farthest
+        # from all chosen ones; unreachable nodes come first so every component gets one.
+        closest = np.full(n, np.inf)
+        candidate = 0
+        while len(landmarks) < min(count, n):
+            landmarks.append(candidate)
+            for attr in attrs:
+                dist, _ = finder.shortest_path_tree(csr.node_ids[candidate], period_of(attr))
+                rows[attr].append(dist)
+            plain = rows["weight"][-1] if "weight" in rows else rows[attrs[0]][-1]
+            closest = np.minimum(closest, plain)
+            closest[landmarks] = -1
+            candidate = int(np.argmax(closest))
+            if closest[candidate] <= 0:
+                break
+        distances = {attr: np.vstack(r) for attr, r in rows.items()}
+        return cls(csr, landmarks, distances)
+
+    def apply_changes(self, changes, old_version, new_version):
+        """
+        GraphBuilder listener. Raised weights keep the bounds admissible and consistent, so only
+        attributes with a lowered weight get their landmark distances recomputed.
+        """
+        lowered = {c.attr for c in changes if c.attr in self.distances and (c.old is None or c.new < c.old)}
+        finder = PathFinder(self.csr, PathCache(max_entries=0))
+        for attr in lowered:
+            self.distances[attr] = np.vstack([
+                finder.shortest_path_tree(self.csr.node_ids[i], period_of(attr))[0] for i in self.landmarks
+            ])
+            self._columns.pop(attr, None)
+
+    def _landmark_columns(self, attr):
+        # Per-node tuples of landmark distances, for cheap lookups inside the search loop
+        if attr not in self._columns:
+            self._columns[attr] = [tuple(col) for col in self.distances[attr].T.tolist()]
+        return self._columns[attr]
+
+    def heuristic(self, attr, target):
+        """h(i) lower-bounding the attr-distance from dense node i to target."""
+        columns = self._landmark_columns(attr)
+        to_target = columns[self.csr.index[target]]
+        inf = float('inf')
+
+        def h(i):
+            best = 0
+            for a, b in zip(to_target, columns[i]):
+                if a == inf or b == inf:
+                    if a != b:
+                        return inf  # different components: target unreachable from i
+                    continue
+                gap = a - b if a > b else b - a
+                if gap > best:
+                    best = gap
+            return best
+
+        return h
@@ -1,23 +1,56 @@
+import heapq
 import networkx as nx
+import numpy as np
+import pandas as pd
+from graphs.csr_graph import CSRGraph
+
+
+def kruskal_arrays(u, v, w, n):
+    """
+    Kruskal over integer edge arrays: u, v are dense endpoint indices in [0, n), w the weights.
+    Returns the positions of the chosen edges in ascending-weight order (ties keep input order).
+    Union-find keeps parent/rank in flat per-node arrays with union by rank and path halving.
+    """
+    order = np.argsort(np.asarray(w), kind="stable")
+    parent = list(range(n))
+    rank = [0] * n
+    us = np.asarray(u)[order].tolist()
+    vs = np.asarray(v)[order].tolist()
+    chosen = []
+    for pos, a, b in zip(order.tolist(), us, vs):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        if rank[a] < rank[b]:
+            a, b = b, a
+        parent[b] = a
+        if rank[a] == rank[b]:
+            rank[a] += 1
+        chosen.append(pos)
+        if len(chosen) == n - 1:
+            break
+    return np.array(chosen, dtype=np.int64)
+
+
 class MSTPlanner:
     def __init__(self, G):
         self.G = G
-    def kruskal_mst(self, critical_nodes=None):
+    def kruskal_mst(self, critical_nodes=None, weight="weight"):
+        # Critical nodes left out are attached to their nearest tree neighbor; the
+        # (node, neighbor, weight) attachments are listed in mst.graph["attachments"]
         mst = nx.Graph()
-        parent = {node: node for node in self.G.nodes}
-        def find(u):
-            while parent[u] != u:
-                parent[u] = parent[parent[u]]
-                u = parent[u]
-            return u
-        def union(u, v):
-            pu, pv = find(u), find(v)
-            parent[pu] = pv
-        edges = sorted(self.G.edges(data=True), key=lambda x: x[2]['weight'])
-        for u, v, data in edges:
-            if find(u) != find(v):
-                mst.add_edge(u, v, **data)
-                union(u, v)
+        mst.graph["attachments"] = []
+        index = {node: i for i, node in enumerate(self.G.nodes)}
+        edges = self._edge_list()
+        u = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+        v = np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges))
+        w = np.fromiter((e[2].get(weight, 1) for e in edges), dtype=np.float64, count=len(edges))
+        mst.add_edges_from(edges[pos] for pos in kruskal_arrays(u, v, w, len(index)).tolist())
         if critical_nodes:
             connected = set(mst.nodes)
             for node in critical_nodes:
@@ -26,12 +59,271 @@ class MSTPlanner:
                     min_weight = float('inf')
                     for neighbor in self.G.neighbors(node):
                         if neighbor in mst:
-                            weight = self.G[node][neighbor].get('weight', 1)
-                            if weight < min_weight:
+                            edge_weight = self.G[node][neighbor].get(weight, 1)
+                            if edge_weight < min_weight:
                                 nearest = neighbor
-                                min_weight = weight
+                                min_weight = edge_weight
                     if nearest:
                         mst.add_edge(node, nearest, **self.G[node][nearest])
-                        print(f"✅ Critical node {node} connected to MST via {nearest} (weight={min_weight})")
+                        mst.graph["attachments"].append((node, nearest, min_weight))
+
+        return mst
+
+    def _edge_list(self):
+        # Same (u, v, data) order as G.edges(data=True), without the view's per-edge overhead
+        edges = []
+        seen = set()
+        for u, nbrs in self.G.adjacency():
+            for v, data in nbrs.items():
+                if v not in seen:
+                    edges.append((u, v, data))
+            seen.add(u)
+        return edges
+
+    def mst_edges(self, weight="weight"):
+        """
+        Minimum spanning forest as a (from_id, to_id, weight) DataFrame, computed purely on
+        arrays; accepts a CSRGraph as well, for networks too large to materialize in NetworkX.
+        """
+        csr = self.G if isinstance(self.G, CSRGraph) else CSRGraph.of(self.G)
+        u, v, w = csr.edge_arrays(weight)
+        chosen = kruskal_arrays(u, v, w, csr.number_of_nodes())
+        ids = np.asarray(csr.node_ids, dtype=object)
+        return pd.DataFrame({"from_id": ids[u[chosen]], "to_id": ids[v[chosen]], weight: w[chosen]})
+
+    def steiner_tree(self, terminals, weight="weight"):
+        """
+        Cheap network connecting only the terminals (e.g. hospitals and government sites),
+        by Mehlhorn's shortest-path 2-approximation: one multi-source Dijkstra splits the
+        graph into Voronoi regions around the terminals, the MST of the region-crossing
+        edges picks which terminals to join, their shortest paths are expanded, re-spanned
+        and non-terminal leaves pruned. Returns {"tree", "cost", "mst_cost", "gap"}, where
+        gap is how much shorter the tree is than the full minimum spanning forest.
+        """
+        csr = self.G if isinstance(self.G, CSRGraph) else CSRGraph.of(self.G)
+        n = csr.number_of_nodes()
+        indptr, indices, weights = csr.lists(weight)
+        sources = list(dict.fromkeys(csr.index[t] for t in terminals))
+
+        # Shared shortest-path forest from all terminals at once; base = nearest terminal
+        inf = float('inf')
+        dist = [inf] * n
+        prev = [-1] * n
+        prev_w = [0] * n
+        base = [-1] * n
+        pq = []
+        for s in sources:
+            dist[s] = 0
+            base[s] = s
+            pq.append((0, s))
+        heapq.heapify(pq)
+        while pq:
+            d, x = heapq.heappop(pq)
+            if d > dist[x]:
+                continue
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                alt = d + weights[k]
+                if alt < dist[y]:
+                    dist[y] = alt
+                    prev[y] = x
+                    prev_w[y] = weights[k]
+                    base[y] = base[x]
+                    heapq.heappush(pq, (alt, y))
+
+        # Cheapest region-crossing edge per terminal pair, then an MST over the terminals
+        u, v, w = csr.edge_arrays(weight)
+        dist_a, base_a = np.array(dist), np.array(base)
+        cross = (base_a[u] >= 0) & (base_a[v] >= 0) & (base_a[u] != base_a[v])
+        u, v, w = u[cross], v[cross], w[cross]
+        via = dist_a[u] + w + dist_a[v]
+        slot = {s: i for i, s in enumerate(sources)}
+        bu = np.array([slot[b] for b in base_a[u].tolist()], dtype=np.int64)
+        bv = np.array([slot[b] for b in base_a[v].tolist()], dtype=np.int64)
+        joined = kruskal_arrays(np.minimum(bu, bv), np.maximum(bu, bv), via, len(sources))
+
+        # Expand each chosen crossing into its terminal-to-terminal path
+        edge_w = {}
+        for pos in joined.tolist():
+            a, b = int(u[pos]), int(v[pos])
+            edge_w[(min(a, b), max(a, b))] = float(w[pos])
+            for x in (a, b):
+                while prev[x] >= 0:
+                    y = prev[x]
+                    edge_w[(min(x, y), max(x, y))] = prev_w[x]
+                    x = y
+        pairs = list(edge_w)
+        pu = np.array([p[0] for p in pairs], dtype=np.int64)
+        pv = np.array([p[1] for p in pairs], dtype=np.int64)
+        pw = np.array([edge_w[p] for p in pairs], dtype=np.float64)
+        adj = {}
+        for pos in kruskal_arrays(pu, pv, pw, n).tolist():
+            a, b = pairs[pos]
+            adj.setdefault(a, {})[b] = pw[pos]
+            adj.setdefault(b, {})[a] = pw[pos]
+
+        # Prune non-terminal leaves until every leaf is a terminal
+        keep = set(sources)
+        leaves = [x for x, nbrs in adj.items() if len(nbrs) == 1 and x not in keep]
+        while leaves:
+            x = leaves.pop()
+            for y in list(adj[x]):
+                del adj[y][x]
+                if len(adj[y]) == 1 and y not in keep:
+                    leaves.append(y)
+            del adj[x]
+
+        ids = csr.node_ids
+        tree = nx.Graph()
+        tree.add_nodes_from(ids[s] for s in sources)
+        for a, nbrs in adj.items():
+            for b, ab_w in nbrs.items():
+                if a < b:
+                    a_id, b_id = ids[a], ids[b]
+                    data = self.G[a_id][b_id] if isinstance(self.G, nx.Graph) else {weight: float(ab_w)}
+                    tree.add_edge(a_id, b_id, **data)
+        cost = sum(tree[a][b].get(weight, 1) for a, b in tree.edges)
+        mst_cost = float(self.mst_edges(weight)[weight].sum())
+        return {"tree": tree, "cost": cost, "mst_cost": mst_cost, "gap": mst_cost - cost}
+
+    def incremental(self, weight="weight"):
+        """IncrementalMST seeded with this graph's minimum spanning forest."""
+        return IncrementalMST(self.G, weight=weight)
 
+
+class IncrementalMST:
+    """
+    Minimum spanning forest kept up to date under single-road changes:
+    - insert_edge: cycle rule, the new road replaces the heaviest tree edge on the path it closes
+    - delete_edge: cut rule, the lightest non-tree road across the split reconnects the two sides;
+      only the smaller side is explored and only the spare roads at its nodes are checked
+    Each call updates the tree locally and reports the change in total length. Self-loops
+    never join a spanning tree and are ignored.
+    """
+
+    def __init__(self, G, weight="weight"):
+        self.weight = weight
+        self.attrs = {}  # (u, v) key -> edge data
+        self.adj = {node: {} for node in G.nodes}  # tree adjacency: node -> {neighbor: weight}
+        self.spare = {}  # non-tree roads: node -> {neighbor: weight}
+        self.total = 0.0
+        for u, v, data in G.edges(data=True):
+            if u != v:
+                self.attrs[self._key(u, v)] = dict(data)
+        for u, v, data in MSTPlanner(G).kruskal_mst(weight=weight).edges(data=True):
+            self._link(u, v, data.get(weight, 1))
+        for (u, v), data in self.attrs.items():
+            if v not in self.adj[u]:
+                self._add_spare(u, v, data.get(weight, 1))
+
+    @staticmethod
+    def _key(u, v):
+        return (u, v) if str(u) <= str(v) else (v, u)
+
+    def _link(self, u, v, w):
+        self.adj.setdefault(u, {})[v] = w
+        self.adj.setdefault(v, {})[u] = w
+        self.total += w
+
+    def _add_spare(self, u, v, w):
+        self.spare.setdefault(u, {})[v] = w
+        self.spare.setdefault(v, {})[u] = w
+
+    def _drop_spare(self, u, v):
+        del self.spare[u][v]
+        del self.spare[v][u]
+
+    def _unlink(self, u, v):
+        w = self.adj[u].pop(v)
+        del self.adj[v][u]
+        self.total -= w
+        return w
+
+    def _tree_path(self, u, v):
+        # Tree edges on the u -> v path (None if u and v are in different trees)
+        parent = {u: None}
+        stack = [u]
+        while stack:
+            x = stack.pop()
+            if x == v:
+                break
+            for y in self.adj.get(x, {}):
+                if y not in parent:
+                    parent[y] = x
+                    stack.append(y)
+        if v not in parent:
+            return None
+        path = []
+        while parent[v] is not None:
+            path.append((parent[v], v))
+            v = parent[v]
+        return path
+
+    def _smaller_side(self, u, v):
+        # Nodes of the smaller tree once u - v is cut: both sides grow one node at a time
+        # and the first one to run out is returned, so the cost is bounded by that side
+        sides = ({u}, {v})
+        stacks = ([u], [v])
+        while True:
+            for seen, stack in zip(sides, stacks):
+                if not stack:
+                    return seen
+                for y in self.adj[stack.pop()]:
+                    if y not in seen:
+                        seen.add(y)
+                        stack.append(y)
+
+    def _report(self, before, added, removed):
+        return {"delta": self.total - before, "total": self.total, "added": added, "removed": removed}
+
+    def insert_edge(self, u, v, **data):
+        """Add a road (e.g. a potential road being built); returns the change report."""
+        before = self.total
+        if u == v:
+            return self._report(before, None, None)
+        key = self._key(u, v)
+        if key in self.attrs:
+            self.delete_edge(u, v)  # re-inserting replaces the old weight
+        w = data.get(self.weight, 1)
+        self.attrs[key] = data
+        path = self._tree_path(u, v) if u in self.adj and v in self.adj else None
+        if path is None:
+            self._link(u, v, w)
+            return self._report(before, key, None)
+        a, b = max(path, key=lambda e: self.adj[e[0]][e[1]])
+        if w < self.adj[a][b]:
+            old = self._unlink(a, b)
+            self._add_spare(a, b, old)
+            self._link(u, v, w)
+            return self._report(before, key, self._key(a, b))
+        self._add_spare(u, v, w)
+        return self._report(before, None, None)
+
+    def delete_edge(self, u, v):
+        """Close a road; returns the change report."""
+        before = self.total
+        if u == v:
+            return self._report(before, None, None)
+        key = self._key(u, v)
+        del self.attrs[key]
+        if v not in self.adj.get(u, {}):
+            self._drop_spare(u, v)
+            return self._report(before, None, None)
+        self._unlink(u, v)
+        side = self._smaller_side(u, v)
+        # Every road across the cut has exactly one end in side; lightest wins, ties by key
+        crossing = [(w, self._key(a, b)) for a in side for b, w in self.spare.get(a, {}).items() if b not in side]
+        if not crossing:
+            return self._report(before, None, key)
+        w, (a, b) = min(crossing)
+        self._drop_spare(a, b)
+        self._link(a, b, w)
+        return self._report(before, (a, b), key)
+
+    def tree(self):
+        mst = nx.Graph()
+        mst.add_nodes_from(self.adj)
+        for u, nbrs in self.adj.items():
+            for v in nbrs:
+                mst.add_edge(u, v, **self.attrs[self._key(u, v)])
         return mst
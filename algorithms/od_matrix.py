@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from graphs.csr_graph import WEIGHT_ATTRS, period_of
+from graphs.graph_builder import GraphBuilder
+from algorithms.path_cache import PathCache
+from algorithms.path_finder import PathFinder
+
+_worker_csr = None
+
+
+def _init_worker(csr):
+    global _worker_csr
+    _worker_csr = csr
+
+
+def _rows(attr, sources, columns, csr=None):
+    csr = csr if csr is not None else _worker_csr
+    finder = PathFinder(csr, PathCache(max_entries=0))
+    return [finder.shortest_path_tree(s, period_of(attr))[0][columns] for s in sources]
+
+
+def inputs_hash(*frames):
+    """Content hash of the DataFrames the matrices are computed from (None entries allowed)."""
+    h = hashlib.sha1()
+    for df in frames:
+        if df is None:
+            h.update(b"<none>")
+            continue
+        h.update(json.dumps([str(c) for c in df.columns]).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class ODMatrix:
+    """
+    Origin-destination shortest travel costs between every neighborhood and facility,
+    one dense matrix per weight attribute (weight, morning/evening/offpeak_weight).
+    Matrices are stored as .npy files under cache_dir/<inputs hash>/ and reloaded
+    memory-mapped, so unchanged road/traffic data costs nothing on the next start.
+    """
+
+    def __init__(self, existing_df, potential_df, coords_df, traffic_df=None, cache_dir="data/.od_cache"):
+        self.existing_df = existing_df
+        self.potential_df = potential_df
+        self.coords_df = coords_df
+        self.traffic_df = traffic_df
+        self.node_ids = pd.unique(coords_df["id"]).tolist()
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.key = inputs_hash(existing_df, potential_df, coords_df[["id"]], traffic_df)
+        self.path = os.path.join(cache_dir, self.key)
+        self.matrices = {}
+
+    def compute(self, attrs=WEIGHT_ATTRS, workers=None, chunk_size=64):
+        """Load stored matrices for attrs, computing (in a process pool) any that are missing."""
+        missing = [attr for attr in attrs if not os.path.exists(self._file(attr))]
+        if missing:
+            self._compute(missing, workers, chunk_size)
+        for attr in attrs:
+            self.matrices[attr] = np.load(self._file(attr), mmap_mode="r")
+        return self.matrices
+
+    def _compute(self, attrs, workers, chunk_size):
+        csr = GraphBuilder().build_csr(self.existing_df, self.potential_df, self.coords_df, self.traffic_df)
+        columns = np.array([csr.index[node] for node in self.node_ids], dtype=np.int64)
+        chunks = [self.node_ids[i:i + chunk_size] for i in range(0, len(self.node_ids), chunk_size)]
+        results = {attr: [] for attr in attrs}
+        if workers == 1:
+            for attr in attrs:
+                for chunk in chunks:
+                    results[attr].extend(_rows(attr, chunk, columns, csr))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csr,)) as pool:
+                futures = {attr: [pool.submit(_rows, attr, chunk, columns) for chunk in chunks] for attr in attrs}
+                for attr in attrs:
+                    for future in futures[attr]:
+                        results[attr].extend(future.result())
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "nodes.json"), "w") as f:
+            json.dump([str(node) for node in self.node_ids], f)
+        for attr in attrs:
+            tmp = self._file(attr) + ".tmp.npy"
+            np.save(tmp, np.vstack(results[attr]) if results[attr] else np.zeros((0, 0)))
+            os.replace(tmp, self._file(attr))  # readers never see a half-written file
+
+    def _file(self, attr):
+        return os.path.join(self.path, f"{attr}.npy")
+
+    def distance(self, origin, destination, attr="weight"):
+        if attr not in self.matrices:
+            self.compute([attr])
+        return float(self.matrices[attr][self.index[origin], self.index[destination]])
+
+    def to_frame(self, attr="weight"):
+        if attr not in self.matrices:
+            self.compute([attr])
+        return pd.DataFrame(np.asarray(self.matrices[attr]), index=self.node_ids, columns=self.node_ids)
@@ -0,0 +1,157 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _sizeof(obj):
+    # Rough byte footprint: container plus its direct items (node IDs are shared with the graph)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(_sizeof(item) for item in obj)
+    return sys.getsizeof(obj)
+
+
+class TreeEdges:
+    """
+    Edges of a shortest-path tree as a PathCache dependency, read from the tree's own prev
+    array (index maps node IDs to its positions) instead of a set of node pairs.
+    """
+
+    def __init__(self, index, prev):
+        self.index = index
+        self.prev = prev
+
+    def isdisjoint(self, edges):
+        prev = self.prev
+        for edge in edges:
+            pair = tuple(edge)
+            u, v = pair[0], pair[-1]
+            i, j = self.index.get(u), self.index.get(v)
+            if i is not None and j is not None and (prev[j] == i or prev[i] == j):
+                return False
+        return True
+
+
+class PathCache:
+    """
+    LRU cache for PathFinder results, bounded by entry count and (optionally) bytes.
+    Entries belong to one graph version (GraphBuilder bumps G.graph["version"] on every
+    edge or weight change); seeing a different version drops everything cached so far.
+    apply_changes (a GraphBuilder listener) instead drops only the entries a weight change
+    can affect. One instance can be shared by many PathFinder objects over the same graph,
+    also across threads (e.g. Streamlit sessions): every operation holds the cache's lock.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.dropped = 0  # entries removed by apply_changes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._depends = {}  # key -> (weight attribute, edges used: set of frozenset({u, v}) or TreeEdges)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def sync(self, version):
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self.clear()
+                self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self.sync(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, version, depends=None):
+        """
+        depends = (attr, edges) lets apply_changes keep the entry through unrelated changes;
+        its size counts towards max_bytes like the entry's.
+        """
+        with self._lock:
+            self.sync(version)
+            if key in self._entries:
+                self._discard(key)
+            size = _sizeof(key) + _sizeof(value) + (_sizeof(depends[1]) if depends is not None else 0)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return value  # would never fit; don't flush the cache for it
+            self._entries[key] = (value, size)
+            if depends is not None:
+                self._depends[key] = depends
+            self.bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+            return value
+
+    def _discard(self, key):
+        self.bytes -= self._entries.pop(key)[1]
+        self._depends.pop(key, None)
+
+    def apply_changes(self, changes, old_version, new_version):
+        """
+        Carry entries over to new_version unless a change can alter them: any weight decrease
+        on their attribute (a new shortcut may appear), or an increase on an edge they use.
+        Entries without dependency information are dropped; a cache that is not at
+        old_version falls back to a full invalidation.
+        """
+        with self._lock:
+            if self.version != old_version:
+                self.sync(new_version)
+                return
+            decreased, raised = set(), {}
+            for u, v, attr, old, new in changes:
+                if old is None or new < old:
+                    decreased.add(attr)
+                else:
+                    raised.setdefault(attr, set()).add(frozenset((u, v)))
+            for key in list(self._entries):
+                depends = self._depends.get(key)
+                if depends is None or depends[0] in decreased or not depends[1].isdisjoint(raised.get(depends[0], ())):
+                    self._discard(key)
+                    self.dropped += 1
+            self.version = new_version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._depends.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "dropped": self.dropped,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "version": self.version,
+            }
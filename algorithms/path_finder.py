@@ -1,14 +1,53 @@
 import heapq
-class PathFinder: # A dictionary to cache previously computed paths so repeated calculations are avoided.
-    def __init__(self, G):
+import numpy as np
+import pandas as pd
+from graphs.csr_graph import CSRGraph, weight_attr
+from algorithms.path_cache import PathCache, TreeEdges
+class PathFinder: # An LRU cache of previously computed paths so repeated calculations are avoided.
+    def __init__(self, G, cache=None, landmarks=None):
         self.G = G
-        self.memo = {}
+        # A CSRGraph (see GraphBuilder.freeze) runs every search on flat arrays
+        self.csr = G if isinstance(G, CSRGraph) else None
+        # Pass one PathCache to several PathFinders to share results across them
+        self.memo = cache if cache is not None else PathCache()
+        # A LandmarkIndex switches a_star / a_star_time_variant to the ALT heuristic
+        self.landmarks = landmarks
+        self.last_expanded = 0  # nodes settled by the most recent array-backed search
+
+    def graph_version(self):
+        if self.csr is not None:
+            return self.csr.version
+        return self.G.graph.get("version", 0)
+
+    def _cached(self, key):
+        return self.memo.get(key, self.graph_version())
+
+    def _store(self, key, result):
+        return self.memo.put(key, result, self.graph_version(), depends=self._depends(key, result))
+
+    def _depends(self, key, result):
+        # Weight attribute and edges a cached result relies on (see PathCache.apply_changes)
+        kind = key[0]
+        if kind in ("dijkstra", "astar", "astar_alt"):
+            attr = "weight"
+        elif kind in ("dijkstra_time", "astar_time", "astar_time_alt"):
+            attr = weight_attr(key[3])
+        else:
+            attr = key[-1]
+        if kind == "spt":
+            return attr, TreeEdges(self.arrays().index, result[1])
+        return attr, {frozenset(pair) for pair in zip(result, result[1:])}
        
 
     def dijkstra(self, source, target):
         key = ("dijkstra", source, target)
-        if key in self.memo:
-            return self.memo[key]
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if self.csr is not None:
+            result = self._csr_dijkstra(source, target, "weight")
+            self._store(key, result)
+            return result
         dist = {node: float('inf') for node in self.G.nodes}
         # Initializes the distance to every node as infinity, meaning they are unreachable at first.
         prev = {node: None for node in self.G.nodes}
@@ -32,14 +71,19 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
             path.append(node)
             node = prev[node]
         result = path[::-1]
-        self.memo[key] = result
+        self._store(key, result)
         # Store the computed result in memo for future reuse and return the path.
         return result
 
     def dijkstra_time_variant(self, source, target, time_period="morning"):
         key = ("dijkstra_time", source, target, time_period)
-        if key in self.memo:
-            return self.memo[key]
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if self.csr is not None:
+            result = self._csr_dijkstra(source, target, weight_attr(time_period))
+            self._store(key, result)
+            return result
 
         dist = {node: float('inf') for node in self.G.nodes}
         prev = {node: None for node in self.G.nodes}
@@ -51,7 +95,7 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
             if u == target:
                 break
             for v in self.G.neighbors(u):
-                weight = self.G[u][v].get(f"{time_period}_weight", 1)
+                weight = self.G[u][v].get(weight_attr(time_period), 1)
                 alt = dist[u] + weight
                 if alt < dist[v]:
                     dist[v] = alt
@@ -64,13 +108,19 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
             path.append(node)
             node = prev[node]
         result = path[::-1]
-        self.memo[key] = result
+        self._store(key, result)
         return result
 
     def a_star(self, source, target, pos):
-        key = ("astar", source, target)
-        if key in self.memo:
-            return self.memo[key]
+        key = ("astar" if self.landmarks is None else "astar_alt", source, target)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if self.csr is not None or self.landmarks is not None:
+            result = self._csr_a_star(source, target, pos, "weight")
+            if result:
+                self._store(key, result)
+            return result
 
         def heuristic(u, v):
             return ((pos[u][0] - pos[v][0]) ** 2 + (pos[u][1] - pos[v][1]) ** 2) ** 0.5
@@ -91,7 +141,7 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
                     current = came_from[current]
                 path.append(source)
                 result = path[::-1]
-                self.memo[key] = result
+                self._store(key, result)
                 return result
             for neighbor in self.G.neighbors(current):
                 tentative_g = g_score[current] + self.G[current][neighbor].get("weight", 1)
@@ -104,9 +154,15 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
         return []
 
     def a_star_time_variant(self, source, target, pos, time_period="morning"):
-        key = ("astar_time", source, target, time_period)
-        if key in self.memo:
-            return self.memo[key]
+        key = ("astar_time" if self.landmarks is None else "astar_time_alt", source, target, time_period)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if self.csr is not None or self.landmarks is not None:
+            result = self._csr_a_star(source, target, pos, weight_attr(time_period))
+            if result:
+                self._store(key, result)
+            return result
 
         def heuristic(u, v):
             return ((pos[u][0] - pos[v][0]) ** 2 + (pos[u][1] - pos[v][1]) ** 2) ** 0.5
@@ -127,10 +183,10 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
                     current = came_from[current]
                 path.append(source)
                 result = path[::-1]
-                self.memo[key] = result
+                self._store(key, result)
                 return result
             for neighbor in self.G.neighbors(current):
-                weight = self.G[current][neighbor].get(f"{time_period}_weight", 1)
+                weight = self.G[current][neighbor].get(weight_attr(time_period), 1)
                 tentative_g = g_score[current] + weight
                 if tentative_g < g_score[neighbor]:
                     came_from[neighbor] = current
@@ -139,3 +195,262 @@ class PathFinder: # A dictionary to cache previously computed paths so repeated
                     heapq.heappush(open_set, (f_score[neighbor], neighbor))
 
         return []
+
+    def bidirectional_dijkstra(self, source, target, time_period=None):
+        """
+        Dijkstra from both ends at once; stops when the two queue minima add up to
+        at least the best meeting cost. time_period=None uses the plain weight.
+        Returns the same path format as dijkstra ([target] if unreachable).
+        """
+        attr = weight_attr(time_period)
+        key = ("bidijkstra", source, target, attr)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        path = self._csr_bidirectional(self.arrays(), source, target, attr)
+        result = path if path else [target]
+        self._store(key, result)
+        return result
+
+    def bidirectional_a_star(self, source, target, pos=None, time_period=None):
+        """
+        Bidirectional A* with the Euclidean heuristic (pos as in a_star, or the graph's x/y
+        when None), using the average potential (h_t - h_s) / 2 so both searches share one
+        consistent reduced cost and the bidirectional Dijkstra stopping rule stays exact.
+        If some edge is shorter than its straight-line length the heuristic is not
+        consistent and this falls back to bidirectional Dijkstra.
+        Returns [] if target is unreachable.
+        """
+        attr = weight_attr(time_period)
+        key = ("biastar", source, target, attr)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        csr = self.arrays()
+        if pos is None:
+            xs, ys = csr.x, csr.y
+        else:
+            xs = np.array([pos[n][0] for n in csr.node_ids], dtype=float)
+            ys = np.array([pos[n][1] for n in csr.node_ids], dtype=float)
+        potential = None
+        if self._euclid_consistent(csr, attr, xs, ys, cache=pos is None):
+            s, t = csr.index[source], csr.index[target]
+            to_t = np.hypot(xs - xs[t], ys - ys[t])
+            to_s = np.hypot(xs - xs[s], ys - ys[s])
+            potential = ((to_t - to_s) / 2).tolist()
+        result = self._csr_bidirectional(csr, source, target, attr, potential)
+        if result:
+            self._store(key, result)
+        return result
+
+    def _euclid_consistent(self, csr, attr, xs, ys, cache=False):
+        # Straight-line distance is a consistent heuristic iff no edge is shorter than it
+        def check():
+            tails = np.repeat(np.arange(csr.number_of_nodes()), np.diff(csr.indptr))
+            straight = np.hypot(xs[tails] - xs[csr.indices], ys[tails] - ys[csr.indices])
+            return bool(np.all(csr.weight_array(attr) >= straight))
+        if cache:
+            return csr.derived(("euclid_consistent", attr), check)
+        return check()
+
+    def _csr_bidirectional(self, csr, source, target, attr, potential=None):
+        # potential[v] is added to forward keys and subtracted from backward keys
+        indptr, indices, weights = csr.lists(attr)
+        s, t = csr.index[source], csr.index[target]
+        if s == t:
+            return [source]
+        n = csr.number_of_nodes()
+        g = ([float('inf')] * n, [float('inf')] * n)
+        prev = ([-1] * n, [-1] * n)
+        g[0][s] = 0
+        g[1][t] = 0
+        p = potential or [0] * n
+        sign = (1, -1)
+        heaps = ([(p[s], s)], [(-p[t], t)])
+        best, meet = float('inf'), None
+        while heaps[0] and heaps[1]:
+            top_f, top_b = heaps[0][0][0], heaps[1][0][0]
+            if top_f + top_b >= best:
+                break
+            side = 0 if top_f <= top_b else 1
+            key, u = heapq.heappop(heaps[side])
+            mine, other, back, sg = g[side], g[1 - side], prev[side], sign[side]
+            gu = mine[u]
+            if key > gu + sg * p[u]:
+                continue  # stale heap entry
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                alt = gu + weights[k]
+                if alt < mine[v]:
+                    mine[v] = alt
+                    back[v] = u
+                    heapq.heappush(heaps[side], (alt + sg * p[v], v))
+                if alt + other[v] < best:
+                    best = alt + other[v]
+                    meet = (u, v) if side == 0 else (v, u)
+        if meet is None:
+            return []
+        # meet is the (forward node, backward node) edge the best path crosses
+        path = []
+        node = meet[0]
+        while node != -1:
+            path.append(node)
+            node = prev[0][node]
+        path.reverse()
+        node = meet[1]
+        while node != -1:
+            path.append(node)
+            node = prev[1][node]
+        return [csr.node_ids[i] for i in path]
+
+    def arrays(self):
+        """CSR view of the graph: the one passed in, or a frozen copy of the NetworkX graph."""
+        if self.csr is not None:
+            return self.csr
+        return CSRGraph.of(self.G)
+
+    def shortest_path_tree(self, source, time_period=None):
+        """
+        One-to-all Dijkstra from source, cached per (source, time period).
+        Returns (dist, prev) NumPy arrays over the dense node indices of arrays();
+        prev[i] is -1 for the source and for unreachable nodes.
+        """
+        attr = weight_attr(time_period)
+        key = ("spt", source, attr)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        csr = self.arrays()
+        dist, prev = self._csr_sssp(csr, csr.index[source], attr)
+        result = (np.array(dist), np.array(prev, dtype=np.int64))
+        self._store(key, result)
+        return result
+
+    def route_from_tree(self, source, target, time_period=None):
+        # Same path as dijkstra / dijkstra_time_variant, read off the cached tree
+        _, prev = self.shortest_path_tree(source, time_period)
+        csr = self.arrays()
+        return self._csr_backtrack(csr, prev, csr.index[target])
+
+    def dijkstra_many(self, pairs, time_period=None):
+        """Paths for a list of (source, target) pairs with one search per distinct source."""
+        by_source = {}
+        for i, (source, target) in enumerate(pairs):
+            by_source.setdefault(source, []).append((i, target))
+        routes = [None] * len(pairs)
+        for source, targets in by_source.items():
+            for i, target in targets:
+                routes[i] = self.route_from_tree(source, target, time_period)
+        return routes
+
+    def _csr_dijkstra(self, source, target, attr):
+        csr = self.csr
+        t = csr.index[target]
+        _, prev = self._csr_sssp(csr, csr.index[source], attr, t)
+        return self._csr_backtrack(csr, prev, t)
+
+    def _csr_sssp(self, csr, s, attr, t=-1):
+        # Dijkstra over dense indices; stops once t is settled (t=-1 settles everything)
+        indptr, indices, weights = csr.lists(attr)
+        n = csr.number_of_nodes()
+        dist = [float('inf')] * n
+        prev = [-1] * n
+        dist[s] = 0
+        pq = [(0, s)]
+        expanded = 0
+        while pq:
+            curr_dist, u = heapq.heappop(pq)
+            if curr_dist > dist[u]:
+                continue  # stale heap entry
+            expanded += 1
+            if u == t:
+                break
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                alt = curr_dist + weights[k]
+                if alt < dist[v]:
+                    dist[v] = alt
+                    prev[v] = u
+                    heapq.heappush(pq, (alt, v))
+        self.last_expanded = expanded
+        return dist, prev
+
+    def _csr_a_star(self, source, target, pos, attr, heuristic=None):
+        csr = self.arrays()
+        indptr, indices, weights = csr.lists(attr)
+        s, t = csr.index[source], csr.index[target]
+        if heuristic is None and self.landmarks is not None:
+            heuristic = self.landmarks.heuristic(attr, target)
+        elif heuristic is None:
+            heuristic = self._euclid_heuristic(csr, pos, target)
+
+        n = csr.number_of_nodes()
+        g_score = [float('inf')] * n
+        came_from = [-1] * n
+        g_score[s] = 0
+        open_set = [(0, s, 0)]
+        expanded = 0
+        while open_set:
+            _, current, g = heapq.heappop(open_set)
+            if g > g_score[current]:
+                continue  # stale heap entry
+            expanded += 1
+            if current == t:
+                self.last_expanded = expanded
+                return self._csr_backtrack(csr, came_from, t)
+            for k in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[k]
+                tentative_g = g + weights[k]
+                if tentative_g < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    heapq.heappush(open_set, (tentative_g + heuristic(neighbor), neighbor, tentative_g))
+        self.last_expanded = expanded
+        return []
+
+    def _euclid_heuristic(self, csr, pos, target):
+        t = csr.index[target]
+        if pos is None:
+            # pos=None falls back to the x/y node attributes frozen into the view
+            xs, ys = csr.xy_lists()
+            tx, ty = xs[t], ys[t]
+
+            def heuristic(i):
+                return ((xs[i] - tx) ** 2 + (ys[i] - ty) ** 2) ** 0.5
+        else:
+            node_ids = csr.node_ids
+            tx, ty = pos[target]
+
+            def heuristic(i):
+                x, y = pos[node_ids[i]]
+                return ((x - tx) ** 2 + (y - ty) ** 2) ** 0.5
+        return heuristic
+
+    def expansion_report(self, pairs, time_period=None, pos=None):
+        """
+        Nodes settled per (source, target) query by plain Dijkstra, Euclidean A* and,
+        when landmarks are set, ALT A*. Searches bypass the route cache.
+        """
+        attr = weight_attr(time_period)
+        csr = self.arrays()
+        rows = []
+        for source, target in pairs:
+            self._csr_sssp(csr, csr.index[source], attr, csr.index[target])
+            row = {"source": source, "target": target, "dijkstra": self.last_expanded}
+            self._csr_a_star(source, target, pos, attr, self._euclid_heuristic(csr, pos, target))
+            row["astar_euclid"] = self.last_expanded
+            if self.landmarks is not None:
+                self._csr_a_star(source, target, pos, attr)
+                row["astar_alt"] = self.last_expanded
+                row["alt_vs_dijkstra"] = row["astar_alt"] / max(row["dijkstra"], 1)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def _csr_backtrack(self, csr, prev, t):
+        node_ids = csr.node_ids
+        path = []
+        node = t
+        while node != -1:
+            path.append(node_ids[node])
+            node = prev[node]
+        return path[::-1]
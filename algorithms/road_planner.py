@@ -0,0 +1,208 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from graphs.csr_graph import CSRGraph, period_of
+from graphs.graph_builder import GraphBuilder
+from algorithms.path_cache import PathCache
+from algorithms.path_finder import PathFinder
+
+_worker_state = {}
+
+
+def _init_worker(matrix_file, origins, destinations, passengers, a, b, w):
+    # The distance matrix is shared through a memory-mapped file the parent rewrites each round
+    _worker_state.update(D=np.load(matrix_file, mmap_mode="r"), origins=origins, destinations=destinations,
+                         passengers=passengers, a=a, b=b, w=w)
+
+
+def _score_chunk(chunk):
+    state = dict(_worker_state)
+    return _gains(state.pop("D"), chunk, **state)
+
+
+def _gains(D, chunk, origins, destinations, passengers, a, b, w):
+    """Demand-weighted travel saved by adding each candidate in chunk on top of D."""
+    current = D[origins, destinations]  # (P,)
+    ca, cb, cw = a[chunk], b[chunk], w[chunk]
+    via_ab = D[origins][:, ca] + cw + D[cb][:, destinations].T  # (P, C)
+    via_ba = D[origins][:, cb] + cw + D[ca][:, destinations].T
+    improved = np.minimum(current[:, None], np.minimum(via_ab, via_ba))
+    return passengers @ (current[:, None] - improved)
+
+
+def _add_road(D, a, b, w):
+    # Exact all-pairs update for one new undirected edge (a, b, w)
+    return np.minimum(D, np.minimum(D[:, [a]] + w + D[[b], :], D[:, [b]] + w + D[[a], :]))
+
+
+class RoadConstructionPlanner:
+    """
+    Chooses which potential roads to build under a construction budget (M EGP) so that
+    total demand-weighted travel cost over public_transport_demand drops the most.
+    Shortest costs are kept as a matrix over the "key" nodes (demand endpoints and
+    candidate endpoints); adding a road updates it exactly in O(keys^2), so candidates
+    are re-scored incrementally instead of re-solving shortest paths per plan.
+    """
+
+    def __init__(self, existing_df, potential_df, demand_df, traffic_df=None, weight="weight", unserved_penalty=None):
+        edges = GraphBuilder().road_edges(existing_df, potential_df, traffic_df)
+        existing = edges[edges["type"] == "existing"]
+        self.candidates = edges[edges["type"] == "potential"].reset_index(drop=True)
+        costs = potential_df.assign(
+            pair=[frozenset(p) for p in zip(potential_df["from_id"], potential_df["to_id"])]
+        ).drop_duplicates("pair", keep="last").set_index("pair")["construction_cost_m_egp"]
+        pairs = [frozenset(p) for p in zip(self.candidates["from_id"], self.candidates["to_id"])]
+        self.candidates["cost"] = costs.reindex(pairs).to_numpy(dtype=float)
+
+        demand = demand_df[["from_id", "to_id", "daily_passengers"]]
+        node_ids = sorted(pd.unique(pd.concat([
+            edges["from_id"], edges["to_id"], demand["from_id"], demand["to_id"]
+        ], ignore_index=True)), key=str)
+        self.csr = CSRGraph.from_edges(
+            node_ids, existing["from_id"], existing["to_id"],
+            {weight: existing[weight].to_numpy(dtype=float)}
+        )
+        self.weight = weight
+
+        keys = pd.unique(pd.concat([
+            demand["from_id"], demand["to_id"], self.candidates["from_id"], self.candidates["to_id"]
+        ], ignore_index=True)).tolist()
+        self.keys = keys
+        key_index = {node: i for i, node in enumerate(keys)}
+        self.origins = np.array([key_index[n] for n in demand["from_id"]], dtype=np.int64)
+        self.destinations = np.array([key_index[n] for n in demand["to_id"]], dtype=np.int64)
+        self.passengers = demand["daily_passengers"].to_numpy(dtype=float)
+        self.a = np.array([key_index[n] for n in self.candidates["from_id"]], dtype=np.int64)
+        self.b = np.array([key_index[n] for n in self.candidates["to_id"]], dtype=np.int64)
+        self.w = self.candidates[weight].to_numpy(dtype=float)
+        self.base = self._key_distances(unserved_penalty)
+
+    def _key_distances(self, unserved_penalty):
+        finder = PathFinder(self.csr, PathCache(max_entries=0))
+        period = period_of(self.weight)
+        columns = np.array([self.csr.index[n] for n in self.keys], dtype=np.int64)
+        D = np.vstack([finder.shortest_path_tree(n, period)[0][columns] for n in self.keys])
+        # Unconnected pairs cost a finite penalty so connecting them counts as a saving
+        finite = D[np.isfinite(D)]
+        penalty = unserved_penalty if unserved_penalty is not None else 2 * (finite.max() if finite.size else 1.0)
+        return np.minimum(D, penalty)
+
+    def travel_cost(self, D):
+        return float(self.passengers @ D[self.origins, self.destinations])
+
+    def _apply(self, selected):
+        D = self.base
+        for c in selected:
+            D = _add_road(D, self.a[c], self.b[c], self.w[c])
+        return D
+
+    def plan(self, budget, time_limit=10.0, workers=None, chunk_size=64, parallel_threshold=256):
+        """
+        Greedy by saving per M EGP (re-scoring every remaining candidate after each pick),
+        guarded by the best single affordable road, then swap-based local search until
+        time_limit seconds have passed. Returns the best plan found.
+        """
+        started = time.time()
+        deadline = started + time_limit
+        cost = self.candidates["cost"].to_numpy()
+        n = len(self.candidates)
+        chunks = [np.arange(i, min(i + chunk_size, n)) for i in range(0, n, chunk_size)]
+        state = dict(origins=self.origins, destinations=self.destinations, passengers=self.passengers,
+                     a=self.a, b=self.b, w=self.w)
+        pool = shared = scratch = None
+        if n >= parallel_threshold and workers != 1:
+            scratch = tempfile.TemporaryDirectory()
+            matrix_file = os.path.join(scratch.name, "D.npy")
+            shared = np.lib.format.open_memmap(matrix_file, mode="w+", dtype=np.float64, shape=self.base.shape)
+            pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                       initargs=(matrix_file, *state.values()))
+        evaluations = 0
+
+        def score(D):
+            nonlocal evaluations
+            evaluations += n
+            if not n:
+                return np.zeros(0)
+            if pool is None:
+                return np.concatenate([_gains(D, chunk, **state) for chunk in chunks])
+            shared[:] = D
+            shared.flush()
+            return np.concatenate(list(pool.map(_score_chunk, chunks)))
+
+        try:
+            base_travel = self.travel_cost(self.base)
+            selected, spent, D = [], 0.0, self.base
+            timed_out = False
+            single = None
+            while True:
+                gains = score(D)
+                if single is None:
+                    single = gains.copy()
+                affordable = (cost <= budget - spent) & (gains > 0)
+                affordable[selected] = False
+                if not affordable.any():
+                    break
+                ratio = np.where(affordable, gains / np.maximum(cost, 1e-9), -np.inf)
+                c = int(np.argmax(ratio))
+                selected.append(c)
+                spent += cost[c]
+                D = _add_road(D, self.a[c], self.b[c], self.w[c])
+                if time.time() > deadline:
+                    timed_out = True
+                    break
+            best = (self.travel_cost(D), list(selected), spent)
+
+            single[cost > budget] = 0
+            if n and single.max() > base_travel - best[0]:
+                c = int(np.argmax(single))
+                best = (base_travel - single[c], [c], cost[c])
+
+            # Swap search: drop one chosen road, refill greedily with the freed budget
+            improved = not timed_out
+            while improved and time.time() < deadline:
+                improved = False
+                for drop in list(best[1]):
+                    if time.time() > deadline:
+                        timed_out = True
+                        break
+                    keep = [c for c in best[1] if c != drop]
+                    D = self._apply(keep)
+                    spent = float(cost[keep].sum()) if keep else 0.0
+                    while time.time() < deadline:
+                        gains = score(D)
+                        affordable = (cost <= budget - spent) & (gains > 0)
+                        affordable[keep + [drop]] = False
+                        if not affordable.any():
+                            break
+                        c = int(np.argmax(np.where(affordable, gains / np.maximum(cost, 1e-9), -np.inf)))
+                        keep.append(c)
+                        spent += cost[c]
+                        D = _add_road(D, self.a[c], self.b[c], self.w[c])
+                    travel = self.travel_cost(D)
+                    if travel < best[0] - 1e-9:
+                        best = (travel, keep, spent)
+                        improved = True
+                        break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+                del shared
+                scratch.cleanup()
+
+        travel, chosen, spent = best
+        return {
+            "roads": self.candidates.iloc[sorted(chosen)][["from_id", "to_id", "distance_km", "cost"]].reset_index(drop=True),
+            "cost": float(spent),
+            "budget": budget,
+            "base_travel": base_travel,
+            "travel": travel,
+            "reduction": base_travel - travel,
+            "evaluations": evaluations,
+            "elapsed": time.time() - started,
+            "timed_out": timed_out,
+        }
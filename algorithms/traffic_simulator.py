@@ -1,94 +1,120 @@
+import numpy as np
 import pandas as pd
 
+from algorithms.traffic_engine import TrafficEngine
+
+PERIODS = ["morning", "afternoon", "evening", "night"]
+FLOW_COLUMNS = {
+    "morning": "morning_peak_veh_h",
+    "afternoon": "afternoon_veh_h",
+    "evening": "evening_peak_veh_h",
+    "night": "night_veh_h",
+}
+
+
+def congestion_levels(total_flow):
+    return np.select([total_flow >= 3000, total_flow >= 1500], ["High", "Moderate"], "Low")
+
+
 class TrafficSimulator:
     def __init__(self, traffic_df):
         self.traffic_df = traffic_df.copy()
+        self._flows = None
+
+    def flow_table(self):
+        """
+        One vectorized pass over traffic_df shared by every analysis: per road the period flows,
+        total, dominant period (first one on ties), green-time split of a 60 s cycle, congestion
+        level and the greedy dominant-period green time. Missing flow columns/values count as 0.
+        Green times are unrounded; the list adapters round them to 0.1 s with the builtin round.
+        """
+        if self._flows is None:
+            df = self.traffic_df
+            n = len(df)
+            flows = np.column_stack([
+                pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy() if col in df.columns else np.zeros(n)
+                for col in FLOW_COLUMNS.values()
+            ]) if n else np.zeros((0, len(PERIODS)))
+            total = flows.sum(axis=1)
+            dominant = flows.argmax(axis=1) if n else np.zeros(0, dtype=np.int64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                share = flows / total[:, None] * 60
+                greedy = flows[np.arange(n), dominant] / total * 60
+            table = pd.DataFrame({
+                "road_id": df["road_id"].to_numpy() if "road_id" in df.columns else np.full(n, None),
+                **{period: flows[:, i] for i, period in enumerate(PERIODS)},
+                "total_flow": total,
+                "dominant_period": np.array(PERIODS)[dominant],
+                **{f"green_{period}": np.where(total > 0, share[:, i], 0)
+                   for i, period in enumerate(PERIODS)},
+                "congestion_level": congestion_levels(total),
+                "greedy_alloc_time": np.where(total > 0, greedy, np.nan),
+            })
+            table["fixed_alloc_time"] = 15
+            table["is_optimal"] = table["greedy_alloc_time"] >= table["fixed_alloc_time"]
+            self._flows = table
+        return self._flows
+
+    def engine(self, G, **options):
+        """Time-stepped TrafficEngine over graph G, fed by this simulator's traffic flows."""
+        return TrafficEngine(G, self.traffic_df, **options)
+
+    def emergency_table(self, emergency_roads):
+        """Green seconds per period for every road: 30 for the prioritized period and 10 otherwise on emergency roads, 15 each elsewhere."""
+        table = self.flow_table()
+        priority = table["road_id"].map(emergency_roads)
+        emergency = priority.notna().to_numpy()
+        plan = pd.DataFrame({"road_id": table["road_id"]})
+        for period in PERIODS:
+            plan[f"green_{period}"] = np.where(emergency, np.where(priority == period, 30, 10), 15)
+        plan["reason"] = np.where(emergency, "Emergency priority → " + priority.astype(str), "Normal cycle")
+        return plan
 
     def simulate_congestion(self):
-        results = []
-        for _, row in self.traffic_df.iterrows():
-            road_id = row.get("road_id")
-            flows = {
-                "morning": row.get("morning_peak_veh_h", 0) or 0,
-                "afternoon": row.get("afternoon_veh_h", 0) or 0,
-                "evening": row.get("evening_peak_veh_h", 0) or 0,
-                "night": row.get("night_veh_h", 0) or 0
-            }
-            total_flow = sum(flows.values())
-            green_time = {
-                period: round((v / total_flow) * 60, 1) if total_flow > 0 else 0
-                for period, v in flows.items()
-            }
-            dominant = max(flows, key=flows.get)
-            congestion = (
-                "High" if total_flow >= 3000 else
-                "Moderate" if total_flow >= 1500 else
-                "Low"
-            )
-            results.append({
+        table = self.flow_table()
+        green = table[[f"green_{period}" for period in PERIODS]].to_numpy().tolist()
+        return [
+            {
                 "road_id": road_id,
                 "total_flow": total_flow,
                 "dominant_period": dominant,
-                "green_time_alloc": green_time,
-                "congestion_level": congestion
-            })
-        return results
+                "green_time_alloc": {period: round(g, 1) if total_flow > 0 else 0 for period, g in zip(PERIODS, split)},
+                "congestion_level": congestion,
+            }
+            for road_id, total_flow, dominant, split, congestion in zip(
+                table["road_id"], table["total_flow"].tolist(), table["dominant_period"],
+                green, table["congestion_level"]
+            )
+        ]
 
     def prioritize_emergency(self, emergency_roads):
         """
         emergency_roads: dict mapping road_id to prioritized time period (e.g. 'morning', 'evening')
         """
-        overrides = []
-        for _, row in self.traffic_df.iterrows():
-            road_id = row.get("road_id")
-            time_periods = ["morning", "afternoon", "evening", "night"]
-            green_default = {t: 15 for t in time_periods}
-            if road_id in emergency_roads:
-                priority = emergency_roads[road_id]
-                green_default = {t: 10 for t in time_periods}
-                green_default[priority] = 30
-                reason = f"Emergency priority → {priority}"
-            else:
-                reason = "Normal cycle"
-            overrides.append({
-                "road_id": road_id,
-                "emergency_plan": green_default,
-                "reason": reason
-            })
-        return overrides
+        plan = self.emergency_table(emergency_roads)
+        green = plan[[f"green_{period}" for period in PERIODS]].to_numpy().tolist()
+        return [
+            {"road_id": road_id, "emergency_plan": dict(zip(PERIODS, split)), "reason": reason}
+            for road_id, split, reason in zip(plan["road_id"], green, plan["reason"])
+        ]
 
     def analyze_greedy_vs_fixed(self):
         """
         Compare greedy timing vs fixed-timing (15s each period) at each road segment.
         """
-        analysis = []
-        for _, row in self.traffic_df.iterrows():
-            road_id = row.get("road_id")
-            flows = {
-                "morning": row.get("morning_peak_veh_h", 0) or 0,
-                "afternoon": row.get("afternoon_veh_h", 0) or 0,
-                "evening": row.get("evening_peak_veh_h", 0) or 0,
-                "night": row.get("night_veh_h", 0) or 0
-            }
-            total_flow = sum(flows.values())
-            if total_flow == 0:
-                continue  # skip invalid data
-
-            dominant = max(flows, key=flows.get)
-            greedy_time = (flows[dominant] / total_flow) * 60
-            fixed_time = 15
-            is_optimal = greedy_time >= fixed_time
-
-            analysis.append({
+        table = self.flow_table()
+        table = table[table["total_flow"] != 0]  # skip invalid data
+        return [
+            {
                 "road_id": road_id,
                 "dominant_period": dominant,
-                "greedy_alloc_time": round(greedy_time, 1),
-                "fixed_alloc_time": fixed_time,
-                "is_optimal": is_optimal,
-                "congestion_level": (
-                    "High" if total_flow >= 3000 else
-                    "Moderate" if total_flow >= 1500 else
-                    "Low"
-                )
-            })
-        return analysis
+                "greedy_alloc_time": round(greedy, 1),
+                "fixed_alloc_time": 15,
+                "is_optimal": optimal,
+                "congestion_level": congestion,
+            }
+            for road_id, dominant, greedy, optimal, congestion in zip(
+                table["road_id"], table["dominant_period"], table["greedy_alloc_time"].tolist(),
+                table["is_optimal"].tolist(), table["congestion_level"]
+            )
+        ]
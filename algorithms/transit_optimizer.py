@@ -1,15 +1,60 @@
+import math
+
 import numpy as np
 import pandas as pd
+
+
+def knapsack_table(cost, benefit, budget):
+    """
+    0/1 knapsack over a 1-D rolling NumPy row. Costs are divided by their GCD first, which
+    shrinks the row without changing any answer. Returns (best, take, scale): best[c] is
+    the best benefit at scaled capacity c (every budget up to `budget` in one pass), and
+    take is the bit-packed (n, capacity) matrix of "item i improved capacity c" flags
+    used to recover the chosen items.
+
+    Recovery keeps that whole matrix, n * (capacity + 8) / 8 bytes; it is not Hirschberg-style
+    divide and conquer, which would need only O(capacity) memory at about twice the time.
+    1,000 routes at a scaled capacity of 10**6 take about 125 MB, so GCD scaling matters.
+    """
+    cost = np.asarray(cost, dtype=np.int64)
+    benefit = np.asarray(benefit)
+    scale = math.gcd(*cost.tolist()) if len(cost) else 0
+    scale = scale or 1
+    scaled = (cost // scale).tolist()
+    capacity = budget // scale
+    exact = np.issubdtype(benefit.dtype, np.integer)
+    best = np.zeros(capacity + 1, dtype=np.int64 if exact else np.float64)
+    take = np.zeros((len(scaled), (capacity + 8) // 8), dtype=np.uint8)
+    for i, (c, b) in enumerate(zip(scaled, benefit.tolist())):
+        if c > capacity:
+            continue
+        with_item = best[:capacity + 1 - c] + b
+        improved = with_item > best[c:]
+        row = np.zeros(capacity + 1, dtype=bool)
+        row[c:] = improved
+        take[i] = np.packbits(row)
+        # with_item was read from the previous row, so each item is used at most once
+        best[c:] = np.where(improved, with_item, best[c:])
+    return best, take, scale
+
+
+def knapsack_items(take, cost, scale, budget):
+    """Chosen item positions for a budget, read back from the packed take matrix (last item first)."""
+    capacity = budget // scale
+    selected = []
+    for i in range(len(cost) - 1, -1, -1):
+        if (take[i, capacity >> 3] >> (7 - (capacity & 7))) & 1:
+            selected.append(i)
+            capacity -= cost[i] // scale
+    return selected
+
+
 class TransitOptimizer:
     def __init__(self, demand_df):
         self.demand_df = demand_df
-    def dp_optimize(self, vehicle_budget=15):
-        """
-        Select routes that maximize coverage of demand under limited vehicles.
-        Each route has:
-        - demand (benefit)
-        - required_vehicles (cost)
-        """
+        self._table = None  # (budget, best, take, scale) of the last solve
+
+    def _routes(self):
         df = self.demand_df.copy()
         # Compute total demand
         if 'demand' not in df.columns:
@@ -22,29 +67,35 @@ class TransitOptimizer:
         # Estimate required vehicles
         if 'required_vehicles' not in df.columns:
             df['required_vehicles'] = np.ceil(df['demand'] / 100).astype(int)
+        return df
 
-        n = len(df)
-        cost = df['required_vehicles'].tolist()
-        benefit = df['demand'].tolist()
-        # DP table
-        dp = [[0] * (vehicle_budget + 1) for _ in range(n + 1)]
-
-        for i in range(1, n + 1):
-            for v in range(vehicle_budget + 1):
-                if cost[i - 1] <= v:
-                    dp[i][v] = max(dp[i - 1][v], dp[i - 1][v - cost[i - 1]] + benefit[i - 1])
-                else:
-                    dp[i][v] = dp[i - 1][v]
-
-        # Backtrack to find selected routes
-        selected = []
-        v = vehicle_budget
-        for i in range(n, 0, -1):
-            if dp[i][v] != dp[i - 1][v]:
-                selected.append(i - 1)
-                v -= cost[i - 1]
+    def _solve(self, max_budget):
+        if self._table is None or self._table[0] < max_budget:
+            df = self._routes()
+            best, take, scale = knapsack_table(df['required_vehicles'], df['demand'].to_numpy(), max_budget)
+            self._table = (max_budget, best, take, scale)
+        return self._table
+
+    def dp_optimize(self, vehicle_budget=15):
+        """
+        Select routes that maximize coverage of demand under limited vehicles.
+        Each route has:
+        - demand (benefit)
+        - required_vehicles (cost)
+        Budgets up to the largest one solved so far (see budget_curve) reuse that table.
+        """
+        df = self._routes()
+        _, _, take, scale = self._solve(vehicle_budget)
+        cost = df['required_vehicles'].astype(int).tolist()
+        selected = knapsack_items(take, cost, scale, vehicle_budget)
 
         if 'route_id' in df.columns:
             return df.iloc[selected]['route_id'].tolist()
         else:
             return df.iloc[selected].index.tolist()
+
+    def budget_curve(self, max_budget=50):
+        """Best covered demand for every vehicle budget 1..max_budget, from a single DP pass."""
+        _, best, _, scale = self._solve(max_budget)
+        budgets = np.arange(1, max_budget + 1)
+        return pd.Series(best[budgets // scale], index=pd.Index(budgets, name='vehicle_budget'), name='demand')
@@ -1,5 +1,4 @@
 import streamlit as st
-import ast
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
@@ -7,30 +6,81 @@ import folium
 from streamlit_folium import st_folium
 from folium.plugins import BeautifyIcon
 from core.data_loader import DataLoader
+from core.node_registry import NodeRegistry
 from graphs.graph_builder import GraphBuilder
 from algorithms.mst_planner import MSTPlanner
 from algorithms.path_finder import PathFinder
+from algorithms.path_cache import PathCache
+from algorithms.landmarks import LandmarkIndex
+from algorithms.road_planner import RoadConstructionPlanner
 from algorithms.transit_optimizer import TransitOptimizer
+from algorithms.fleet_allocator import FleetAllocator
 from algorithms.traffic_simulator import TrafficSimulator
+from algorithms.signal_optimizer import SignalOptimizer
+from algorithms.green_wave import GreenWavePlanner
 
 st.set_page_config(layout="wide")
 st.title("🚦 Smart Cairo Transportation Optimizer")
 
-# Load data with normalized columns
-loader = DataLoader()
-data = loader.load_all()
+# Load data with normalized columns; reruns read the columnar snapshot until a CSV changes,
+# and each table is only read once a view asks for it
+loader = DataLoader(snapshot_dir="data/.snapshot")
+data = loader.load_lazy()
 
-# Combine coordinates
-coords_df = pd.concat([data['neighborhoods'], data['facilities']])
+# Source files behind the cached network and transit index: editing one rebuilds them
+NETWORK_TABLES = ["neighborhoods", "facilities", "existing_roads", "potential_roads", "traffic_flow"]
+network_stamp = loader.stamp(NETWORK_TABLES)
+transit_stamp = loader.stamp(["bus_routes", "metro_lines"])
 
-# Build graph with roads and traffic (if handled in GraphBuilder)
-builder = GraphBuilder()
-G = builder.build_from_roads(
-    data['existing_roads'],
-    data['potential_roads'],
-    coords_df=coords_df,
-    traffic_df=data['traffic_flow']  # Assumes GraphBuilder supports this
-)
+
+@st.cache_resource(max_entries=1)
+def load_node_registry(_data, stamp):
+    # Neighborhoods and facilities under one dense index: coordinates, names and types for every view
+    return NodeRegistry.from_data(_data)
+
+
+@st.cache_resource(max_entries=1)
+def load_network(_data, _registry, stamp):
+    # Built once per source stamp so the graph version (and cached routes) survive reruns
+    builder = GraphBuilder()
+    G = builder.build_from_roads(
+        _data['existing_roads'],
+        _data['potential_roads'],
+        coords_df=_registry,
+        traffic_df=_data['traffic_flow']  # Assumes GraphBuilder supports this
+    )
+    # Array-backed view shared by the routing tabs, plus ALT landmarks for the A* views
+    csr = builder.freeze()
+    landmarks = LandmarkIndex.build(csr)
+    # Live weight updates (core/traffic_feed.py) patch the CSR view and refresh only lowered landmarks
+    builder.add_listener(landmarks.apply_changes)
+    return builder, G, csr, landmarks
+
+
+@st.cache_resource(max_entries=1)
+def shared_path_cache(_builder, stamp):
+    # One LRU route cache for every PathFinder built on a rerun; weight updates drop only affected routes
+    cache = PathCache(max_entries=4096)
+    _builder.add_listener(cache.apply_changes)
+    return cache
+
+
+@st.cache_resource(max_entries=1)
+def load_transit_index(_data, stamp):
+    # Stop lists parsed once per source stamp into interned route/stop arrays
+    return loader.transit_index(_data)
+
+
+registry = load_node_registry(data, network_stamp)
+builder, G, csr, landmarks = load_network(data, registry, network_stamp)
+transit = load_transit_index(data, transit_stamp)
+path_cache = shared_path_cache(builder, network_stamp)
+
+# Per-session planners hold the graph they were built on; start them over once it is rebuilt
+if st.session_state.get("network_stamp") != network_stamp:
+    for key in ("mst_whatif", "green_wave", "signal_optimizer"):
+        st.session_state.pop(key, None)
+    st.session_state["network_stamp"] = network_stamp
 
 # UI - Navigation
 st.sidebar.header("Select View")
@@ -46,8 +96,6 @@ if tab == "City Map":
     facilities = data['facilities']
     existing_roads = data['existing_roads']
     potential_roads = data['potential_roads']
-    metro_lines = data['metro_lines']
-    bus_routes = data['bus_routes']
 
     # Sidebar filters
     with st.sidebar:
@@ -114,45 +162,26 @@ if tab == "City Map":
             icon=folium.Icon(icon=icon, prefix="fa", color="blue")
         ).add_to(layer_facilities)
 
-    for _, row in existing_roads.iterrows():
-        if row['from_id'] in coords_df['id'].values and row['to_id'] in coords_df['id'].values:
-            a = coords_df[coords_df['id'] == row['from_id']].iloc[0]
-            b = coords_df[coords_df['id'] == row['to_id']].iloc[0]
-            folium.PolyLine([(a['y'], a['x']), (b['y'], b['x'])], color="gray", weight=2).add_to(layer_existing)
+    # Roads are drawn when both endpoints pass the filters; endpoints are gathered per edge list
+    visible = registry.mask(coords_df['id'])
+    _, segments = registry.segments(existing_roads['from_id'], existing_roads['to_id'], visible)
+    for segment in segments:
+        folium.PolyLine(segment, color="gray", weight=2).add_to(layer_existing)
 
-    for _, row in potential_roads.iterrows():
-        if row['from_id'] in coords_df['id'].values and row['to_id'] in coords_df['id'].values:
-            a = coords_df[coords_df['id'] == row['from_id']].iloc[0]
-            b = coords_df[coords_df['id'] == row['to_id']].iloc[0]
-            folium.PolyLine(
-                [(a['y'], a['x']), (b['y'], b['x'])],
-                color="blue", weight=2, dash_array="5,10"
-            ).add_to(layer_potential)
-
-    for _, row in metro_lines.iterrows():
-        stops = row['stations'].split("->")
-        coords = []
-        for stop in stops:
-            if stop in coords_df['id'].astype(str).values:
-                pt = coords_df[coords_df['id'].astype(str) == stop].iloc[0]
-                coords.append((pt['y'], pt['x']))
-        if len(coords) >= 2:
-            folium.PolyLine(coords, color="green", weight=3, tooltip=row['name']).add_to(layer_metro)
+    _, segments = registry.segments(potential_roads['from_id'], potential_roads['to_id'], visible)
+    for segment in segments:
+        folium.PolyLine(
+            segment,
+            color="blue", weight=2, dash_array="5,10"
+        ).add_to(layer_potential)
 
+    for _, name, coords in transit.paths(registry, mode="metro", visible=visible):
+        if len(coords) >= 2:
+            folium.PolyLine(coords, color="green", weight=3, tooltip=name).add_to(layer_metro)
 
-    for _, row in bus_routes.iterrows():
-        try:
-            stop_ids = ast.literal_eval(row['stops'])
-            coords = []
-            for stop in stop_ids:
-                stop = str(stop)
-                if stop in coords_df['id'].astype(str).values:
-                    pt = coords_df[coords_df['id'].astype(str) == stop].iloc[0]
-                    coords.append((pt['y'], pt['x']))
-            if len(coords) >= 2:
-                folium.PolyLine(coords, color="orange", weight=2, tooltip=row.get('routeid', 'Bus Route')).add_to(layer_bus)
-        except Exception as e:
-            st.warning(f"Error parsing bus route: {e}")
+    for route_id, _, coords in transit.paths(registry, mode="bus", visible=visible):
+        if len(coords) >= 2:
+            folium.PolyLine(coords, color="orange", weight=2, tooltip=route_id).add_to(layer_bus)
 
 
     folium.LayerControl().add_to(fmap)
@@ -197,9 +226,8 @@ if tab == "City Map":
 elif tab == "Route Finder":
     st.header("🚗 Route Finder (Folium)")
 
-    name_df = pd.concat([data['neighborhoods'], data['facilities']])
-    id_to_name = {row['id']: row['name'] for _, row in name_df.iterrows()}
-    id_to_coords = {row['id']: (row['y'], row['x']) for _, row in name_df.iterrows()}
+    id_to_name = registry.name_map()
+    id_to_coords = registry.latlon_map()
 
     nodes = list(G.nodes)
     display_names = [f"{nid} - {id_to_name.get(nid, 'Unknown')}" for nid in nodes]
@@ -211,12 +239,19 @@ elif tab == "Route Finder":
     end = node_selector[end_display]
 
     algo = st.radio("Select Algorithm", ["Dijkstra", "Dijkstra (Time-Variant)"])
+    bidirectional = st.checkbox("Bidirectional search", key="r_bidir")
     time_period = "morning"
     if algo == "Dijkstra (Time-Variant)":
         time_period = st.selectbox("Select Time Period", ["morning", "evening", "offpeak"])
-        route = PathFinder(G).dijkstra_time_variant(start, end, time_period=time_period)
+        if bidirectional:
+            route = PathFinder(csr, path_cache).bidirectional_dijkstra(start, end, time_period=time_period)
+        else:
+            route = PathFinder(csr, path_cache).route_from_tree(start, end, time_period=time_period)
+    elif bidirectional:
+        route = PathFinder(csr, path_cache).bidirectional_dijkstra(start, end)
     else:
-        route = PathFinder(G).dijkstra(start, end)
+        # Cached shortest-path tree: switching the end node is a backtrack, not a new search
+        route = PathFinder(csr, path_cache).route_from_tree(start, end)
 
     # Create base map with no tiles initially
     m = folium.Map(location=[30.05, 31.25], zoom_start=11, tiles=None)
@@ -261,15 +296,12 @@ elif tab == "Route Finder":
 elif tab == "MST Network":
     st.header("🛣 Optimized Road Network (Minimum Spanning Tree)")
 
-    neighborhoods = data['neighborhoods']
-    facilities = data['facilities']
-    coords_df = pd.concat([neighborhoods, facilities])
-    id_to_pos = {row['id']: (row['y'], row['x']) for _, row in coords_df.iterrows()}
-    id_to_name = {row['id']: row['name'] for _, row in coords_df.iterrows()}
-    id_to_type = {row['id']: row['type'] for _, row in coords_df.iterrows()}
+    id_to_pos = registry.latlon_map()
+    id_to_name = registry.name_map()
+    id_to_type = registry.type_map()
 
     builder = GraphBuilder()
-    G = builder.build_from_roads(data['existing_roads'], data['potential_roads'], coords_df=coords_df)
+    G = builder.build_from_roads(data['existing_roads'], data['potential_roads'], coords_df=registry)
     critical_ids = data['facilities'].query("type in ['hospital', 'government']")['id'].tolist()
     mst = MSTPlanner(G).kruskal_mst(critical_nodes=critical_ids)
     mst_nodes = mst.number_of_nodes()
@@ -281,7 +313,58 @@ elif tab == "MST Network":
     - 🔗 Edges in MST: *{mst_edges}*
     - 📏 Total MST Length: *{mst_length:.2f} km*
     """)
-    center = [coords_df['y'].mean(), coords_df['x'].mean()]
+    for node, nearest, weight in mst.graph["attachments"]:
+        st.caption(f"✅ Critical node {id_to_name.get(node, node)} connected to MST via "
+                   f"{id_to_name.get(nearest, nearest)} (weight={weight})")
+
+    steiner_mode = st.checkbox("🏥 Steiner mode: connect only selected facilities", key="mst_steiner")
+    if steiner_mode:
+        terminals = st.multiselect(
+            "Facilities to connect", data['facilities']['id'].tolist(),
+            default=data['facilities']['id'].tolist(), format_func=lambda i: id_to_name.get(i, i)
+        )
+        steiner = MSTPlanner(G).steiner_tree(terminals)
+        st.write(f"🌿 Steiner tree: *{steiner['cost']:.2f} km* over {steiner['tree'].number_of_edges()} roads "
+                 f"(*{steiner['gap']:.2f} km* less than the full MST of {steiner['mst_cost']:.2f} km)")
+
+    with st.expander("🔧 What-if: close roads (incremental MST)"):
+        road_labels = {f"{u} - {v}": (u, v) for u, v in G.edges}
+        closed = st.multiselect("Closed roads", list(road_labels))
+        # The incremental tree lives across reruns; only the changed selections are applied
+        if "mst_whatif" not in st.session_state:
+            st.session_state["mst_whatif"] = {"inc": MSTPlanner(G).incremental(), "closed": []}
+        whatif = st.session_state["mst_whatif"]
+        changes = []
+        for label in whatif["closed"]:
+            if label not in closed:
+                u, v = road_labels[label]
+                changes.append({"road": label, "action": "reopen", **whatif["inc"].insert_edge(u, v, **G[u][v])})
+        for label in closed:
+            if label not in whatif["closed"]:
+                u, v = road_labels[label]
+                changes.append({"road": label, "action": "close", **whatif["inc"].delete_edge(u, v)})
+        whatif["closed"] = closed
+        st.write(f"📏 Network length with closures: *{whatif['inc'].total:.2f} km* "
+                 f"({whatif['inc'].total - mst_length:+.2f} km vs. full MST)")
+        if changes:
+            st.dataframe(pd.DataFrame(changes).astype(str))
+
+    with st.expander("💰 Road construction under a budget"):
+        budget = st.number_input("Budget (M EGP)", min_value=0, value=1500, step=100)
+        time_limit = st.slider("Search time limit (s)", 1, 30, 5)
+        if st.button("Plan construction"):
+            planner = RoadConstructionPlanner(
+                data['existing_roads'], data['potential_roads'],
+                data['public_transport_demand'], data['traffic_flow']
+            )
+            plan = planner.plan(budget, time_limit=time_limit)
+            st.write(f"🏗 Cost: *{plan['cost']:.0f} / {budget} M EGP* — demand-weighted travel "
+                     f"cut by *{plan['reduction']:,.0f} passenger-km/day* "
+                     f"({plan['reduction'] / plan['base_travel']:.1%})")
+            st.dataframe(plan['roads'])
+    if steiner_mode:
+        mst = steiner['tree']  # the map highlights the Steiner tree instead
+    center = [registry.y.mean(), registry.x.mean()]
     fmap = folium.Map(location=center, zoom_start=11, control_scale=True)
 
     icon_map = {
@@ -334,9 +417,8 @@ elif tab == "MST Network":
 elif tab == "Emergency Routing":
     st.header("🚑 Emergency Route Planner (A*) (Folium)")
 
-    name_df = pd.concat([data['neighborhoods'], data['facilities']])
-    id_to_name = {row['id']: row['name'] for _, row in name_df.iterrows()}
-    id_to_coords = {row['id']: (row['y'], row['x']) for _, row in name_df.iterrows()}
+    id_to_name = registry.name_map()
+    id_to_coords = registry.latlon_map()
     pos = {node: (G.nodes[node].get("x", 0), G.nodes[node].get("y", 0)) for node in G.nodes}
 
     nodes = list(G.nodes)
@@ -349,12 +431,20 @@ elif tab == "Emergency Routing":
     end = node_selector[end_display]
 
     algo = st.radio("Select A* Variant", ["A*", "A* (Time-Variant)"])
+    bidirectional = st.checkbox("Bidirectional search", key="e_bidir")
+    # Landmark (ALT) lower bounds replace the straight-line heuristic
+    finder = PathFinder(csr, path_cache, landmarks=landmarks)
     time_period = "morning"
     if algo == "A* (Time-Variant)":
         time_period = st.selectbox("Select Time Period", ["morning", "evening", "offpeak"])
-        route = PathFinder(G).a_star_time_variant(start, end, pos, time_period=time_period)
+        if bidirectional:
+            route = finder.bidirectional_a_star(start, end, pos, time_period=time_period)
+        else:
+            route = finder.a_star_time_variant(start, end, pos, time_period=time_period)
+    elif bidirectional:
+        route = finder.bidirectional_a_star(start, end, pos)
     else:
-        route = PathFinder(G).a_star(start, end, pos)
+        route = finder.a_star(start, end, pos)
 
     # Create base map with no tiles initially
     m = folium.Map(location=[30.05, 31.25], zoom_start=11, tiles=None)
@@ -391,13 +481,33 @@ elif tab == "Emergency Routing":
 
     st_folium(m, width=1000, height=600)
 
+    with st.expander("🔬 Search effort (nodes expanded)"):
+        report = finder.expansion_report(
+            [(start, end)], time_period=time_period if algo == "A* (Time-Variant)" else None, pos=pos
+        )
+        st.dataframe(report)
+
+    with st.expander("🟢 Green-wave signal pre-emption"):
+        # One planner per session so simultaneous dispatches see each other's reservations
+        if "green_wave" not in st.session_state:
+            st.session_state["green_wave"] = GreenWavePlanner(finder)
+        waves = st.session_state["green_wave"]
+        vehicle_id = st.text_input("Vehicle ID", value=f"EV-{len(waves.vehicles) + 1}")
+        priority = st.selectbox("Priority", [3, 2, 1], format_func=lambda p: {3: "Critical", 2: "Urgent", 1: "Routine"}[p])
+        depart = st.number_input("Departure (s from now)", min_value=0, value=0, step=30)
+        if st.button("Dispatch with green wave"):
+            waves.add_vehicle(vehicle_id, route, depart=depart, priority=priority,
+                              time_period=time_period if algo == "A* (Time-Variant)" else None)
+        if waves.vehicles:
+            st.dataframe(pd.concat([waves.windows(v) for v in waves.vehicles], ignore_index=True))
+            st.write({v: f"held {info['delay']:.0f} s" for v, info in waves.vehicles.items()})
+
 elif tab == "Transit Optimization":
     st.header("🚌 Transit Demand & Optimization")
 
     demand_df = data['public_transport_demand']
     bus_routes_df = data['bus_routes']
-    coords_df = pd.concat([data['neighborhoods'], data['facilities']])
-    id_to_coord = {row['id']: (row['y'], row['x']) for _, row in coords_df.iterrows()}
+    id_to_coord = registry.latlon_map()
 
     # Allow user to choose vehicle budget
     vehicle_budget = st.slider("Select available vehicles (bus/metro):", 1, 50, 15)
@@ -408,10 +518,42 @@ elif tab == "Transit Optimization":
         'morning_peak_demand': bus_routes_df['daily_passengers']
     })
 
-    # Optimize with DP
+    # Optimize with DP: one pass covers every slider position, the selection reuses that table
     optimizer = TransitOptimizer(synthetic_demand)
+    curve = optimizer.budget_curve(max_budget=50)
     selected_routes = optimizer.dp_optimize(vehicle_budget=vehicle_budget)
     st.success(f"Optimized Transit Plan: {selected_routes}")
+    st.caption(f"Covered demand at {vehicle_budget} vehicles: {curve[vehicle_budget]:,}")
+    st.line_chart(curve)
+
+    st.subheader("🚍 Fleet Sizes per Route (bus + metro budgets)")
+    col_bus, col_metro = st.columns(2)
+    bus_budget = col_bus.number_input("Bus fleet", min_value=0, value=int(bus_routes_df['buses'].sum()), step=10)
+    metro_budget = col_metro.number_input("Metro trains", min_value=0, value=120, step=10)
+    fleet = FleetAllocator.from_data(bus_routes_df, data['metro_lines']).allocate(bus_budget, metro_budget)
+    st.write(f"Captured demand: *{fleet['captured']:,.0f}* passengers/day "
+             f"(within {fleet['gap_pct']:.2%} of optimal)")
+    st.caption(f"Bus routes vs the current fleet: {fleet['captured_gain']:+,.0f} passengers/day "
+               f"(now {fleet['current_captured']:,.0f})")
+    st.dataframe(fleet['allocation'])
+
+    with st.expander("🔁 Transfers between stops"):
+        stop_names = registry.name_map()
+        col_a, col_b = st.columns(2)
+        origin = col_a.selectbox("From stop", transit.node_ids, format_func=lambda i: stop_names.get(i, i))
+        destination = col_b.selectbox("To stop", transit.node_ids, index=min(1, len(transit.node_ids) - 1),
+                                      format_func=lambda i: stop_names.get(i, i))
+        direct = transit.direct_routes(origin, destination)
+        st.write(f"Direct routes: {', '.join(direct) or 'none'}")
+        if not direct:
+            # One transfer: a route at the origin that shares a stop with a route at the destination
+            options = [(a, b, transit.shared_stops(a, b)) for a in transit.routes_at(origin)
+                       for b in transit.routes_at(destination)]
+            options = [f"{a} → {b} at {', '.join(stop_names.get(s, s) for s in shared)}"
+                       for a, b, shared in options if shared]
+            st.write(options or "No route with a single transfer")
+        st.caption(f"{len(transit.coverage(mode='bus'))} stops served by bus, "
+                   f"{len(transit.coverage(mode='metro'))} by metro")
 
     st.subheader("📊 Full Bus Routes Demand Table")
     st.dataframe(bus_routes_df)
@@ -427,21 +569,16 @@ elif tab == "Transit Optimization":
         else:
             return "#228B22"
 
-    for _, row in bus_routes_df.iterrows():
-        try:
-            stops = eval(row['stops'])  # lowercase + renamed by DataLoader
-            coords = [id_to_coord[s] for s in stops if s in id_to_coord]
-            if len(coords) >= 2:
-                val = int(row['daily_passengers'])  # lowercase
-                folium.PolyLine(
-                    coords,
-                    color=color_by_demand(val),
-                    weight=4,
-                    dash_array="5",
-                    tooltip=row['route_id']
-                ).add_to(transit_map)
-        except Exception as e:
-            st.warning(f"Skipping route {row.get('route_id', '?')} due to error: {e}")
+    for route_id, _, coords in transit.paths(registry, mode="bus"):
+        if len(coords) >= 2:
+            val = int(transit.passengers[transit.route_index[route_id]])
+            folium.PolyLine(
+                coords,
+                color=color_by_demand(val),
+                weight=4,
+                dash_array="5",
+                tooltip=route_id
+            ).add_to(transit_map)
 
     for node_id, (y, x) in id_to_coord.items():
         folium.Marker(
@@ -458,8 +595,22 @@ elif tab == "Traffic Simulation":
     simulator = TrafficSimulator(data['traffic_flow'])
 
     st.subheader("🔄 Real-Time Congestion Simulation (Greedy Allocation)")
-    report = simulator.simulate_congestion()
-    st.json(report)
+    flows = simulator.flow_table()  # one columnar pass shared by all three views
+    st.dataframe(flows.drop(columns=["greedy_alloc_time", "fixed_alloc_time", "is_optimal"]))
+
+    with st.expander("⏱ Time-stepped network simulation (queues and spillback)"):
+        sim_hours = st.slider("Simulated hours", 1, 24, 24)
+        if st.button("Run simulation"):
+            engine = simulator.engine(G)
+            chart = st.empty()
+            history = []
+            # Metrics stream out of the generator; only a thinned series is kept for the chart
+            for metrics in engine.run(hours=sim_hours, report_every=10):
+                history.append(metrics)
+                if len(history) % 12 == 0:
+                    chart.line_chart(pd.DataFrame(history).set_index("time_h")[["vehicles", "entry_queue"]])
+            chart.line_chart(pd.DataFrame(history).set_index("time_h")[["vehicles", "entry_queue"]])
+            st.dataframe(engine.link_state().sort_values("occupancy", ascending=False).head(15))
 
     st.subheader("🚨 Emergency Vehicle Priority Plan")
     emergency_roads = {
@@ -467,15 +618,33 @@ elif tab == "Traffic Simulation":
         "4-2": "evening",
         "F1-5": "night"
     }  # Example override; consider making this user-selectable
-    emergency_plan = simulator.prioritize_emergency(emergency_roads)
-    st.json(emergency_plan)
+    emergency_plan = simulator.emergency_table(emergency_roads)
+    st.dataframe(emergency_plan)
 
     st.subheader("📊 Greedy vs Fixed Timing Analysis")
-    analysis = simulator.analyze_greedy_vs_fixed()
-    st.dataframe(pd.DataFrame(analysis))
+    analysis = flows.loc[flows["total_flow"] != 0, [
+        "road_id", "dominant_period", "greedy_alloc_time", "fixed_alloc_time", "is_optimal", "congestion_level"
+    ]]
+    st.dataframe(analysis)
+
+    st.markdown("#### 🚥 Network Signal Timing (Webster splits, coordinated clusters)")
+    signal_period = st.selectbox("Flow period", [
+        "morning_peak_veh_h", "afternoon_veh_h", "evening_peak_veh_h", "night_veh_h"
+    ], key="signal_period")
+    # Kept across reruns so a new period warm-starts from the previous cycles
+    if "signal_optimizer" not in st.session_state:
+        st.session_state["signal_optimizer"] = SignalOptimizer(G, data['traffic_flow'])
+    signals = st.session_state["signal_optimizer"]
+    signals.set_flows(data['traffic_flow'], signal_period)
+    timing = signals.optimize()
+    st.write(f"Network delay: *{timing['delay']['optimized']:,.0f} veh·h/h* — "
+             f"{timing['reduction_vs_greedy']:.1%} less than the greedy split, "
+             f"{timing['reduction_vs_fixed']:.1%} less than the fixed split "
+             f"({timing['clusters']} signal clusters)")
+    st.dataframe(timing['plan'])
 
     # Optimization Pie Chart Summary
-    optimal_count = sum(1 for a in analysis if a['is_optimal'])
+    optimal_count = int(analysis['is_optimal'].sum())
     suboptimal_count = len(analysis) - optimal_count
 
     st.markdown("#### 🧮 Optimization Effectiveness")
@@ -1,11 +1,53 @@
+import os
+from collections.abc import Mapping
+
 import pandas as pd
 
+from core.transit_index import TransitIndex
+
+ID_COLUMNS = ['id', 'from_id', 'to_id', 'route_id', 'line_id']
+
+# Table name -> (CSV file, column rename map applied after lowercasing, or None to keep the header)
+TABLES = {
+    "neighborhoods": ("neighborhoods.csv", None),
+    "facilities": ("facilities.csv", None),
+    "existing_roads": ("existing_roads.csv", None),
+    "potential_roads": ("potential_roads.csv", None),
+    "bus_routes": ("bus_routes.csv", {
+        "routeid": "route_id",
+        "stops": "stops",
+        "stations": "stations",
+        "buses": "buses",
+        "daily": "daily_passengers"
+    }),
+    "metro_lines": ("metro_lines.csv", {
+        "line_id": "line_id",
+        "stations": "stations",
+        "name": "name",
+        "daily_passengers": "daily_passengers"
+    }),
+    "traffic_flow": ("traffic_flow.csv", {
+        "intersection": "intersection",
+        "northbound": "northbound_flow",
+        "eastbound": "eastbound_flow",
+        "southbound": "southbound_flow",
+        "westbound": "westbound_flow"
+    }),
+    "public_transport_demand": ("public_transport_demand.csv", {
+        "from": "from_id",
+        "to": "to_id",
+        "dailypassengers": "daily_passengers"
+    }),
+}
+
 class DataLoader:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", snapshot_dir=None):
         self.data_dir = data_dir
+        # When set, load_all reads the columnar snapshot (core/snapshot.py) kept in this directory
+        self.snapshot_dir = snapshot_dir
 
-    def load_csv(self, filename):
-        return pd.read_csv(f"{self.data_dir}/{filename}")
+    def load_csv(self, filename, **options):
+        return pd.read_csv(f"{self.data_dir}/{filename}", **options)
 
     def normalize_columns(self, df, rename_map):
         df.columns = df.columns.str.strip().str.lower()  # Clean and lowercase
@@ -14,60 +56,125 @@ class DataLoader:
 
     def cast_ids(self, df):
         # Convert relevant ID columns to string
-        for col in ['id', 'from_id', 'to_id', 'route_id', 'line_id']:
+        for col in ID_COLUMNS:
             if col in df.columns:
                 df[col] = df[col].astype(str)
         return df
 
+    def load_table(self, name, columns=None, where=None, chunksize=100_000):
+        """
+        One table from its CSV with the table's rules applied. columns (normalized names) are
+        the only ones parsed; where(chunk) -> boolean mask filters rows chunk by chunk, so only
+        matching rows are ever held. where sees the selected columns.
+        """
+        filename, rename_map = TABLES[name]
+        if where is None:
+            df = self._normalize(self.load_csv(filename, **self._usecols(name, columns)), rename_map)
+        else:
+            parts = [chunk[where(chunk)] for chunk in self.iter_table(name, columns, chunksize)]
+            if not parts:
+                header = self.load_csv(filename, nrows=0, **self._usecols(name, columns))
+                parts = [self._normalize(header, rename_map)]
+            df = pd.concat(parts)
+        return df if columns is None else df[list(columns)]
+
+    def iter_table(self, name, columns=None, chunksize=100_000, source=None):
+        """Normalized chunks of chunksize rows; source is an open CSV file to read instead of the table's own."""
+        filename, rename_map = TABLES[name]
+        options = dict(self._usecols(name, columns), chunksize=chunksize)
+        reader = pd.read_csv(source, **options) if source is not None else self.load_csv(filename, **options)
+        with reader:
+            for chunk in reader:
+                chunk = self._normalize(chunk, rename_map)
+                yield chunk if columns is None else chunk[list(columns)]
+
+    def _usecols(self, name, columns):
+        # read_csv options parsing only the given (normalized) columns
+        if columns is None:
+            return {}
+        filename, rename_map = TABLES[name]
+        raw = self.load_csv(filename, nrows=0).columns
+        names = dict(zip(self._normalized(raw, rename_map), raw))
+        missing = [col for col in columns if col not in names]
+        if missing:
+            raise KeyError(f"{name} has no column(s) {missing}")
+        return {"usecols": [names[col] for col in columns]}
+
+    def _normalize(self, df, rename_map):
+        if rename_map is not None:
+            df = self.normalize_columns(df, rename_map)
+        return self.cast_ids(df)
+
+    def _normalized(self, raw, rename_map):
+        # Column names after normalize_columns, without reading any rows
+        if rename_map is None:
+            return list(raw)
+        return [rename_map.get(col, col) for col in raw.str.strip().str.lower()]
+
+    def read(self, name, columns=None, where=None):
+        # Snapshot when configured, CSV otherwise
+        if self.snapshot_dir is None:
+            return self.load_table(name, columns, where)
+        from core.snapshot import DataSnapshot
+        df = DataSnapshot(self, self.snapshot_dir).load([name], columns=columns)[name]
+        return df if where is None else df[where(df)]
+
+    def stamp(self, tables=None):
+        """
+        ((table, mtime_ns, size), ...) of the source CSVs: a hashable key that changes whenever
+        one of them is edited, e.g. to rebuild what a cache derived from those tables.
+        """
+        result = []
+        for name in tables or TABLES:
+            stat = os.stat(os.path.join(self.data_dir, TABLES[name][0]))
+            result.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(result)
+
+    def transit_index(self, data=None):
+        """TransitIndex of the bus routes and metro lines in data (default: read lazily)."""
+        data = data if data is not None else self.load_lazy()
+        return TransitIndex.from_data(data["bus_routes"], data["metro_lines"])
+
+    def load_lazy(self):
+        """Mapping of the same tables as load_all; each is read on first access."""
+        return LazyTables(self)
+
     def load_all(self):
-        return {
-            "neighborhoods": self.cast_ids(self.load_csv("neighborhoods.csv")),
-            "facilities": self.cast_ids(self.load_csv("facilities.csv")),
-            "existing_roads": self.cast_ids(self.load_csv("existing_roads.csv")),
-            "potential_roads": self.cast_ids(self.load_csv("potential_roads.csv")),
-            "bus_routes": self.cast_ids(
-                self.normalize_columns(
-                    self.load_csv("bus_routes.csv"),
-                    {
-                        "routeid": "route_id",
-                        "stops": "stops",
-                        "stations": "stations",
-                        "buses": "buses",
-                        "daily": "daily_passengers"
-                    }
-                )
-            ),
-            "metro_lines": self.cast_ids(
-                self.normalize_columns(
-                    self.load_csv("metro_lines.csv"),
-                    {
-                        "line_id": "line_id",
-                        "stations": "stations",
-                        "name": "name",
-                        "daily_passengers": "daily_passengers"
-                    }
-                )
-            ),
-            "traffic_flow": self.cast_ids(
-                self.normalize_columns(
-                    self.load_csv("traffic_flow.csv"),
-                    {
-                        "intersection": "intersection",
-                        "northbound": "northbound_flow",
-                        "eastbound": "eastbound_flow",
-                        "southbound": "southbound_flow",
-                        "westbound": "westbound_flow"
-                    }
-                )
-            ),
-            "public_transport_demand": self.cast_ids(
-                self.normalize_columns(
-                    self.load_csv("public_transport_demand.csv"),
-                    {
-                        "from": "from_id",
-                        "to": "to_id",
-                        "dailypassengers": "daily_passengers"
-                    }
-                )
-            )
-        }
+        if self.snapshot_dir is not None:
+            from core.snapshot import DataSnapshot
+            return DataSnapshot(self, self.snapshot_dir).load()
+        return {name: self.load_table(name) for name in TABLES}
+
+
+class LazyTables(Mapping):
+    """
+    Read-only mapping over TABLES: a table is read and normalized the first time it is looked
+    up and memoized afterwards. select() reads just some columns/rows without memoizing.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._tables = {}
+
+    def __getitem__(self, name):
+        if name not in TABLES:
+            raise KeyError(name)
+        if name not in self._tables:
+            self._tables[name] = self.loader.read(name)
+        return self._tables[name]
+
+    def __iter__(self):
+        return iter(TABLES)
+
+    def __len__(self):
+        return len(TABLES)
+
+    def loaded(self):
+        return list(self._tables)
+
+    def select(self, name, columns=None, where=None):
+        if name in self._tables:
+            df = self._tables[name]
+            df = df if where is None else df[where(df)]
+            return df if columns is None else df[list(columns)]
+        return self.loader.read(name, columns, where)
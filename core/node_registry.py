@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+
+class NodeRegistry:
+    """
+    Neighborhoods and facilities under one dense index: ids[i] has coordinates (x[i], y[i]),
+    name[i] and type[i]. Built once; point lookups are dict/array reads and whole ID columns
+    (an edge list, a route) are gathered with one vectorized index lookup. A repeated ID keeps
+    its last row, like the graph nodes GraphBuilder creates from the same tables.
+    """
+
+    def __init__(self, ids, x, y, names=None, types=None):
+        self.ids = [str(i) for i in ids]
+        self.index = {node: i for i, node in enumerate(self.ids)}
+        self._lookup = pd.Index(self.ids)
+        n = len(self.ids)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.names = np.asarray(names if names is not None else self.ids, dtype=object)
+        self.types = np.asarray(types if types is not None else [None] * n, dtype=object)
+        self._maps = {}
+
+    @classmethod
+    def from_frame(cls, coords_df):
+        """From one coords table (id, x, y and optional name/type columns)."""
+        df = coords_df.assign(id=coords_df["id"].astype(str))
+        df = df.drop_duplicates("id", keep="last")
+        return cls(
+            df["id"].tolist(), df["x"].to_numpy(dtype=float), df["y"].to_numpy(dtype=float),
+            df["name"].to_numpy(dtype=object) if "name" in df.columns else None,
+            df["type"].to_numpy(dtype=object) if "type" in df.columns else None,
+        )
+
+    @classmethod
+    def from_data(cls, data):
+        """From the neighborhoods and facilities tables of DataLoader.load_all / load_lazy."""
+        return cls.from_frame(pd.concat([data["neighborhoods"], data["facilities"]], ignore_index=True))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def indices(self, ids):
+        """Dense index of every ID in ids (-1 for unknown ones)."""
+        return self._lookup.get_indexer(pd.Index(np.asarray(ids, dtype=object).astype(str)))
+
+    def mask(self, ids):
+        """Boolean array over the registry marking the given IDs (e.g. the nodes a view shows)."""
+        keep = np.zeros(len(self.ids), dtype=bool)
+        found = self.indices(ids)
+        keep[found[found >= 0]] = True
+        return keep
+
+    def xy(self, ids, fill=np.nan):
+        """(x, y) arrays for ids; unknown IDs get fill."""
+        i = self.indices(ids)
+        known = i >= 0
+        if not len(self.ids):
+            return np.full(len(i), fill, dtype=float), np.full(len(i), fill, dtype=float)
+        return np.where(known, self.x[i], fill), np.where(known, self.y[i], fill)
+
+    def latlon(self, ids, visible=None):
+        """(len(ids), 2) array of (lat, lon) = (y, x) for folium; NaN where unknown or not visible."""
+        i = self.indices(ids)
+        ok = i >= 0
+        if not len(self.ids):
+            return np.full((len(i), 2), np.nan)
+        if visible is not None:
+            ok &= visible[np.maximum(i, 0)]
+        return np.where(ok[:, None], np.column_stack([self.y[i], self.x[i]]), np.nan)
+
+    def segments(self, from_ids, to_ids, visible=None):
+        """
+        Map segments of a whole edge list: (rows, [[(lat, lon), (lat, lon)], ...]) for the edges
+        whose two endpoints are known (and visible), rows being their positions in the list.
+        """
+        a = self.latlon(from_ids, visible)
+        b = self.latlon(to_ids, visible)
+        rows = np.flatnonzero(~(np.isnan(a).any(axis=1) | np.isnan(b).any(axis=1)))
+        return rows, np.stack([a[rows], b[rows]], axis=1).tolist()
+
+    def _map(self, key, values):
+        if key not in self._maps:
+            self._maps[key] = dict(zip(self.ids, values))
+        return self._maps[key]
+
+    def name_map(self):
+        return self._map("name", self.names.tolist())
+
+    def type_map(self):
+        return self._map("type", self.types.tolist())
+
+    def latlon_map(self):
+        """{id: (lat, lon)} for folium markers."""
+        return self._map("latlon", zip(self.y.tolist(), self.x.tolist()))
+
+    def xy_map(self):
+        """{id: (x, y)}, the pos argument of PathFinder's A* and nx.draw."""
+        return self._map("xy", zip(self.x.tolist(), self.y.tolist()))
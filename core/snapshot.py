@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.data_loader import ID_COLUMNS, TABLES, DataLoader
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # optional: without pyarrow tables are stored as one .npy file per column
+    feather = None
+
+# Bumped whenever the stored column layout changes, so snapshots written before are rebuilt
+LAYOUT = 2
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DataSnapshot:
+    """
+    Columnar copy of the normalized DataLoader tables under snapshot_dir (default
+    <data_dir>/.snapshot). Each table is stored once per source content, with ID columns
+    dictionary-encoded: Arrow Feather when pyarrow is installed, otherwise one .npy file
+    per column. manifest.json records every source file's mtime, size and SHA-1; an
+    unchanged mtime/size skips hashing, and a touched but identical file only refreshes
+    its mtime. Stale tables are rebuilt from CSV; the rest are read memory-mapped.
+    """
+
+    def __init__(self, loader=None, snapshot_dir=None):
+        self.loader = loader if loader is not None else DataLoader()
+        self.path = snapshot_dir or os.path.join(self.loader.data_dir, ".snapshot")
+        self.format = "feather" if feather is not None else "npy"
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, "manifest.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def _key(self, name, digest):
+        # The normalization rules are part of the key, so changing them invalidates the table
+        rules = json.dumps([TABLES[name], ID_COLUMNS, self.format], sort_keys=True)
+        return hashlib.sha1((digest + rules).encode()).hexdigest()[:16]
+
+    def status(self, tables=None):
+        """{table: "fresh" | "stale" | "missing"}; refreshes the mtime of touched but unchanged files."""
+        result = {}
+        dirty = False
+        for name in tables or TABLES:
+            source = os.path.join(self.loader.data_dir, TABLES[name][0])
+            entry = self.manifest.get(name)
+            stat = os.stat(source)
+            if entry is None or not os.path.isdir(os.path.join(self.path, entry["dir"])):
+                result[name] = "missing"
+            elif entry["format"] != self.format or entry.get("layout") != LAYOUT:
+                result[name] = "stale"
+            elif entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                result[name] = "fresh"
+            elif entry["key"] == self._key(name, file_hash(source)):
+                entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+                dirty = True
+                result[name] = "fresh"
+            else:
+                result[name] = "stale"
+        if dirty:
+            self._write_manifest()
+        return result
+
+    def build(self, tables=None, force=False):
+        """Re-read and store every stale (or, with force, every) table; returns {table: rows}."""
+        os.makedirs(self.path, exist_ok=True)
+        status = self.status(tables)
+        built = {}
+        for name, state in status.items():
+            if state == "fresh" and not force:
+                continue
+            source = os.path.join(self.loader.data_dir, TABLES[name][0])
+            stat = os.stat(source)
+            key = self._key(name, file_hash(source))
+            df = self.loader.load_table(name)
+            folder = f"{name}-{key}"
+            target = os.path.join(self.path, folder)
+            tmp = target + ".tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            columns = self._write(df, tmp)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(tmp, target)  # readers never see a half-written table
+
+            old = self.manifest.get(name)
+            self.manifest[name] = {"source": TABLES[name][0], "format": self.format, "layout": LAYOUT,
+                                   "key": key, "dir": folder,
+                                   "mtime": stat.st_mtime, "size": stat.st_size, "rows": len(df),
+                                   "columns": columns}
+            self._write_manifest()
+            if old is not None and old["dir"] != folder:
+                shutil.rmtree(os.path.join(self.path, old["dir"]), ignore_errors=True)
+            built[name] = len(df)
+        return built
+
+    def _write(self, df, folder):
+        columns = [{"name": str(col), "encoded": col in ID_COLUMNS} for col in df.columns]
+        if self.format == "feather":
+            table = pd.DataFrame({str(col): df[col].astype("category") if col in ID_COLUMNS else df[col]
+                                  for col in df.columns})
+            # Uncompressed so the file can be memory-mapped on read
+            feather.write_feather(table.reset_index(drop=True), os.path.join(folder, "table.feather"),
+                                  compression="uncompressed")
+            return columns
+        # Text is stored as fixed-width unicode (missing values in a separate mask), so every
+        # file loads with allow_pickle=False and memory-mapped
+        for i, col in enumerate(df.columns):
+            values = df[col]
+            if col in ID_COLUMNS:
+                codes, categories = pd.factorize(values)
+                np.save(os.path.join(folder, f"{i}.npy"), codes.astype(np.int32))
+                np.save(os.path.join(folder, f"{i}.categories.npy"), np.asarray(categories).astype(str))
+                continue
+            array = values.to_numpy()
+            if array.dtype == object:
+                missing = values.isna().to_numpy()
+                columns[i]["text"] = True
+                array = np.where(missing, "", array).astype(str)
+                np.save(os.path.join(folder, f"{i}.missing.npy"), missing)
+            np.save(os.path.join(folder, f"{i}.npy"), array)
+        return columns
+
+    def _read(self, name, categorical, columns=None):
+        entry = self.manifest[name]
+        folder = os.path.join(self.path, entry["dir"])
+        stored = [col["name"] for col in entry["columns"]]
+        missing = [col for col in columns or [] if col not in stored]
+        if missing:
+            raise KeyError(f"{name} has no column(s) {missing}")
+        wanted = set(stored if columns is None else columns)
+        data = {}
+        if entry["format"] == "feather":
+            df = feather.read_table(os.path.join(folder, "table.feather"), columns=columns,
+                                    memory_map=True).to_pandas()
+            for col in entry["columns"]:
+                if col["encoded"] and col["name"] in wanted and not categorical:
+                    df[col["name"]] = df[col["name"]].astype(str)
+            return df
+        for i, col in enumerate(entry["columns"]):
+            if col["name"] not in wanted:
+                continue
+            array = np.load(os.path.join(folder, f"{i}.npy"), mmap_mode="r")
+            if col["encoded"]:
+                categories = np.load(os.path.join(folder, f"{i}.categories.npy"), mmap_mode="r")
+                data[col["name"]] = (pd.Categorical.from_codes(array, categories) if categorical
+                                     else pd.array(categories.take(array), dtype="str"))
+            elif col.get("text"):
+                missing = np.load(os.path.join(folder, f"{i}.missing.npy"), mmap_mode="r")
+                data[col["name"]] = pd.Series(array, dtype="str").mask(missing)
+            else:
+                data[col["name"]] = array
+        df = pd.DataFrame(data, index=pd.RangeIndex(entry["rows"]))
+        return df if columns is None else df[list(columns)]
+
+    def load(self, tables=None, categorical=False, columns=None):
+        """
+        The DataLoader tables, rebuilding stale ones first. ID columns come back as strings,
+        exactly as load_all returns them, or as pandas categoricals with categorical=True.
+        columns limits every requested table to those columns; the others are never read.
+        """
+        self.build(tables)
+        return {name: self._read(name, categorical, columns) for name in tables or TABLES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the columnar snapshot of the CSV data tables.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--snapshot-dir", default=None, help="default: <data-dir>/.snapshot")
+    parser.add_argument("--force", action="store_true", help="rebuild every table, even unchanged ones")
+    args = parser.parse_args(argv)
+
+    snapshot = DataSnapshot(DataLoader(args.data_dir), args.snapshot_dir)
+    started = time.time()
+    built = snapshot.build(force=args.force)
+    for name, entry in sorted(snapshot.manifest.items()):
+        state = f"built ({built[name]} rows)" if name in built else "unchanged"
+        print(f"{name:<25} {state}")
+    print(f"Snapshot ({snapshot.format}) in {snapshot.path}: {time.time() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
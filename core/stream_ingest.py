@@ -0,0 +1,124 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from core.data_loader import TABLES, DataLoader
+from graphs.graph_builder import TRAFFIC_COLUMNS, GraphBuilder
+
+
+def print_progress(report):
+    print(f"{report['table']:<16} chunk {report['chunk']:>4}  {report['rows']:>12,} rows  "
+          f"{report['fraction']:6.1%}  {report['rows_per_s']:>12,.0f} rows/s", flush=True)
+
+
+class StreamingIngest:
+    """
+    Builds the road graph from CSVs too large to hold in memory: every table is read in
+    chunks of chunksize rows and each chunk goes straight into traffic aggregation or
+    GraphBuilder.add_roads, so peak memory is one chunk plus the per-road results.
+    progress(report) is called after every chunk with the table, chunk number, rows so far,
+    fraction of the file read and rows/s; stats keeps the totals per table.
+    """
+
+    def __init__(self, loader=None, chunksize=100_000, progress=None):
+        self.loader = loader if loader is not None else DataLoader()
+        self.chunksize = chunksize
+        self.progress = progress
+        self.stats = {}  # table -> {"rows", "chunks", "seconds", "rows_per_s"}
+
+    def chunks(self, name, columns=None):
+        """Normalized chunks of one table, reporting progress as they are read."""
+        path = os.path.join(self.loader.data_dir, TABLES[name][0])
+        size = os.path.getsize(path)
+        started = time.time()
+        rows = chunks = 0
+        with open(path, "rb") as f:
+            for chunk in self.loader.iter_table(name, columns, self.chunksize, source=f):
+                rows += len(chunk)
+                chunks += 1
+                elapsed = time.time() - started
+                stats = {"rows": rows, "chunks": chunks, "seconds": elapsed,
+                         "rows_per_s": rows / elapsed if elapsed > 0 else 0.0}
+                self.stats[name] = stats
+                if self.progress is not None:
+                    # The parser reads ahead, so the file position runs slightly ahead of the rows
+                    self.progress({"table": name, "chunk": chunks, "fraction": f.tell() / size if size else 1.0,
+                                   **stats})
+                yield chunk
+
+    def traffic_flows(self, name="traffic_flow", how="last"):
+        """
+        Per-direction flows like GraphBuilder.traffic_by_direction, aggregated chunk by chunk:
+        how="last" keeps the latest row for each road (the in-memory rule), how="mean"
+        averages every observation of it (e.g. a traffic log).
+        """
+        builder = GraphBuilder()
+        if how == "last":
+            flows, pending = None, []
+            for chunk in self.chunks(name):
+                pending.append(builder.traffic_by_direction(chunk))
+                # Merge once the unmerged chunks outgrow the result, so merging stays linear overall
+                if sum(map(len, pending)) >= max(0 if flows is None else len(flows), 2 * self.chunksize):
+                    flows, pending = self._latest(flows, pending), []
+            return self._latest(flows, pending)
+        if how != "mean":
+            raise ValueError(f"unknown aggregation: {how}")
+        total = count = None
+        for chunk in self.chunks(name):
+            grouped = builder.directed_traffic(chunk).groupby(["u", "v"], sort=False)[TRAFFIC_COLUMNS]
+            part_sum, part_count = grouped.sum(), grouped.count()
+            total = part_sum if total is None else total.add(part_sum, fill_value=0)
+            count = part_count if count is None else count.add(part_count, fill_value=0)
+        if total is None:
+            return None
+        return total / count.where(count > 0)
+
+    def _latest(self, flows, pending):
+        frames = ([] if flows is None else [flows]) + pending
+        if not frames:
+            return flows
+        merged = pd.concat(frames)
+        return merged[~merged.index.duplicated(keep="last")]
+
+    def build_graph(self, builder=None, coords=True, potential=True, traffic=True, how="last"):
+        """
+        Stream the tables into builder (a new GraphBuilder by default) and return its graph:
+        coordinates, then traffic aggregation, then existing roads and potential roads.
+        """
+        builder = builder if builder is not None else GraphBuilder()
+        if coords:
+            for name in ("neighborhoods", "facilities"):
+                for chunk in self.chunks(name, ["id", "x", "y"]):
+                    builder.G.add_nodes_from(zip(
+                        chunk["id"],
+                        ({"x": x, "y": y} for x, y in zip(chunk["x"].tolist(), chunk["y"].tolist()))
+                    ))
+        flows = self.traffic_flows(how=how) if traffic else None
+        tables = [("existing_roads", "existing")] + ([("potential_roads", "potential")] if potential else [])
+        for name, road_type in tables:
+            for chunk in self.chunks(name):
+                builder.add_roads(chunk, road_type, flows)
+        return builder.G
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the road and traffic CSVs into the road graph.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--how", choices=["last", "mean"], default="last", help="traffic aggregation")
+    parser.add_argument("--no-potential", action="store_true")
+    args = parser.parse_args(argv)
+
+    ingest = StreamingIngest(DataLoader(args.data_dir), args.chunksize, progress=print_progress)
+    started = time.time()
+    G = ingest.build_graph(potential=not args.no_potential, how=args.how)
+    rows = sum(s["rows"] for s in ingest.stats.values())
+    elapsed = time.time() - started
+    print(f"Graph: {G.number_of_nodes():,} nodes, {G.number_of_edges():,} edges from {rows:,} rows "
+          f"in {elapsed:.1f} s ({rows / elapsed if elapsed > 0 else 0:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import io
+import os
+import socket
+import time
+
+import pandas as pd
+
+# Observation lines use the traffic_flow.csv layout
+FEED_COLUMNS = ["road_id", "morning_peak_veh_h", "afternoon_veh_h", "evening_peak_veh_h", "night_veh_h"]
+
+
+def parse_lines(lines):
+    """Observation lines ("road_id,morning,afternoon,evening,night"; header lines skipped) -> DataFrame."""
+    body = "\n".join(line for line in lines if line.strip() and not line.startswith("road_id"))
+    df = pd.read_csv(io.StringIO(body), header=None, names=FEED_COLUMNS, dtype={"road_id": str})
+    for col in FEED_COLUMNS[1:]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def tail_file(path, poll_s=0.2, from_start=False, idle_timeout=None):
+    """
+    Follow a file being appended to (like tail -f), yielding complete lines. Yields None on
+    every idle poll so the consumer can close a micro-window; stops after idle_timeout seconds
+    without new data (never, if None).
+    """
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        idle_since = time.time()
+        while True:
+            chunk = f.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith("\n"):
+                    yield partial.rstrip("\n")
+                    partial = ""
+                idle_since = time.time()
+                continue
+            if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                return
+            yield None
+            time.sleep(poll_s)
+
+
+def socket_lines(host, port, poll_s=0.2):
+    """Newline-delimited observations from a TCP socket (a local stand-in for a sensor stream)."""
+    with socket.create_connection((host, port)) as sock:
+        sock.settimeout(poll_s)
+        buffer = b""
+        while True:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                yield None
+                continue
+            if not data:
+                if buffer.strip():
+                    yield buffer.decode()
+                return
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.decode()
+
+
+class TrafficFeed:
+    """
+    Streams traffic observations into a GraphBuilder graph in micro-windows: lines are
+    collected for window_s seconds (or max_batch lines), the last reading per road wins,
+    and GraphBuilder.apply_traffic updates just those roads' period weights. Caches and
+    routing structures registered with builder.add_listener receive the change set.
+    """
+
+    def __init__(self, builder, window_s=1.0, max_batch=5000):
+        self.builder = builder
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.windows = 0
+        self.observations = 0
+        self.changes = 0
+
+    def run(self, lines, max_windows=None):
+        """Consume a line source (tail_file, socket_lines, any iterable); yields one summary per window."""
+        batch = []
+        opened = None
+        for line in lines:
+            if line is not None:
+                batch.append(line)
+                opened = opened or time.time()
+            if batch and (len(batch) >= self.max_batch or time.time() - opened >= self.window_s):
+                yield self._flush(batch)
+                batch, opened = [], None
+                if max_windows is not None and self.windows >= max_windows:
+                    return
+        if batch:
+            yield self._flush(batch)
+
+    def _flush(self, lines):
+        started = time.time()
+        observed = parse_lines(lines)
+        changes = self.builder.apply_traffic(observed) if len(observed) else []
+        self.windows += 1
+        self.observations += len(observed)
+        self.changes += len(changes)
+        return {
+            "window": self.windows,
+            "observations": len(observed),
+            "roads": observed["road_id"].nunique(),
+            "changes": changes,
+            "version": self.builder.G.graph["version"],
+            "apply_ms": (time.time() - started) * 1000,
+        }
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from core.node_registry import NodeRegistry
+
+
+def split_stops(series, sep):
+    """
+    Stop IDs of every row of a stop-list column, as one Series indexed by row: bus_routes.stops
+    ("['1', '3', '6']", sep=",") or metro_lines.stations ("1->12->3", sep="->"). Parsed with
+    string operations, never evaluated.
+    """
+    text = series.fillna("").astype(str).str.strip().str.strip("[]")
+    parts = text.str.split(sep).explode()
+    parts = parts.str.strip().str.strip("'\"").str.strip()
+    return parts[parts.notna() & (parts != "")]
+
+
+class TransitIndex:
+    """
+    Bus routes and metro lines over interned stop IDs (node_ids[code]):
+    - stops of route r are route_stops[route_ptr[r]:route_ptr[r + 1]], in travel order
+    - routes through stop s are stop_routes[stop_ptr[s]:stop_ptr[s + 1]], each listed once
+    Built once from the loaded tables, so views never re-parse the stop lists.
+    """
+
+    def __init__(self, route_ids, modes, names, passengers, node_ids, route_ptr, route_stops):
+        self.route_ids = list(route_ids)
+        self.modes = np.asarray(modes, dtype=object)
+        self.names = list(names)
+        self.passengers = np.asarray(passengers, dtype=float)
+        self.node_ids = list(node_ids)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.route_index = {route: r for r, route in enumerate(self.route_ids)}
+        self.route_ptr = np.asarray(route_ptr, dtype=np.int64)
+        self.route_stops = np.asarray(route_stops, dtype=np.int32)
+
+        # Inverted index over distinct (stop, route) pairs
+        R = max(len(self.route_ids), 1)
+        routes = np.repeat(np.arange(len(self.route_ids), dtype=np.int64), np.diff(self.route_ptr))
+        pairs = np.unique(self.route_stops.astype(np.int64) * R + routes)
+        self.stop_ptr = np.zeros(len(self.node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs // R, minlength=len(self.node_ids)), out=self.stop_ptr[1:])
+        self.stop_routes = (pairs % R).astype(np.int32)
+
+    @classmethod
+    def from_data(cls, bus_routes_df=None, metro_lines_df=None):
+        tables = []
+        if bus_routes_df is not None:
+            tables.append((bus_routes_df["route_id"], "bus", bus_routes_df["route_id"],
+                           bus_routes_df.get("daily_passengers"), split_stops(bus_routes_df["stops"], ",")))
+        if metro_lines_df is not None:
+            names = metro_lines_df["name"] if "name" in metro_lines_df.columns else metro_lines_df["line_id"]
+            tables.append((metro_lines_df["line_id"], "metro", names,
+                           metro_lines_df.get("daily_passengers"), split_stops(metro_lines_df["stations"], "->")))
+        route_ids, modes, names, passengers, stops, counts = [], [], [], [], [], []
+        for ids, mode, label, demand, parts in tables:
+            position = pd.Series(np.arange(len(ids)), index=ids.index)
+            route_ids.extend(ids.astype(str).tolist())
+            modes.extend([mode] * len(ids))
+            names.extend(label.astype(str).tolist())
+            passengers.extend(demand.to_numpy(dtype=float) if demand is not None else np.full(len(ids), np.nan))
+            stops.append(parts.to_numpy(dtype=object))
+            counts.append(np.bincount(position[parts.index].to_numpy(), minlength=len(ids)))
+        all_stops = np.concatenate(stops) if stops else np.zeros(0, dtype=object)
+        codes, node_ids = pd.factorize(all_stops)
+        route_ptr = np.zeros(len(route_ids) + 1, dtype=np.int64)
+        if counts:
+            np.cumsum(np.concatenate(counts), out=route_ptr[1:])
+        return cls(route_ids, modes, names, passengers, list(node_ids), route_ptr, codes)
+
+    def __len__(self):
+        return len(self.route_ids)
+
+    def stop_codes(self, route_id):
+        r = self.route_index[route_id]
+        return self.route_stops[self.route_ptr[r]:self.route_ptr[r + 1]]
+
+    def stops(self, route_id):
+        return [self.node_ids[s] for s in self.stop_codes(route_id).tolist()]
+
+    def _route_codes(self, stop):
+        s = self.index.get(stop)
+        if s is None:
+            return self.stop_routes[:0]
+        return self.stop_routes[self.stop_ptr[s]:self.stop_ptr[s + 1]]
+
+    def routes_at(self, stop):
+        return [self.route_ids[r] for r in self._route_codes(stop).tolist()]
+
+    def direct_routes(self, origin, destination):
+        """Routes serving both stops (a trip without transfer)."""
+        both = np.intersect1d(self._route_codes(origin), self._route_codes(destination), assume_unique=True)
+        return [self.route_ids[r] for r in both.tolist()]
+
+    def transfers(self, route_id):
+        """Other routes sharing at least one stop with route_id."""
+        stops = np.unique(self.stop_codes(route_id))
+        routes = np.unique(np.concatenate([self.stop_routes[self.stop_ptr[s]:self.stop_ptr[s + 1]]
+                                           for s in stops.tolist()] or [self.stop_routes[:0]]))
+        r = self.route_index[route_id]
+        return [self.route_ids[x] for x in routes.tolist() if x != r]
+
+    def shared_stops(self, a, b):
+        """Transfer stops between two routes."""
+        common = np.intersect1d(self.stop_codes(a), self.stop_codes(b))
+        return [self.node_ids[s] for s in common.tolist()]
+
+    def coverage(self, route_ids=None, mode=None):
+        """Distinct stops served by the given routes (default: every route, optionally one mode)."""
+        if route_ids is None:
+            rows = np.arange(len(self.route_ids)) if mode is None else np.flatnonzero(self.modes == mode)
+        else:
+            rows = np.array([self.route_index[r] for r in route_ids], dtype=np.int64)
+        counts = np.diff(self.route_ptr)[rows]
+        offsets = np.repeat(self.route_ptr[rows] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return [self.node_ids[s] for s in np.unique(self.route_stops[offsets]).tolist()]
+
+    def coordinates(self, nodes, visible=None):
+        """(lat, lon) for every interned stop from a NodeRegistry or coords table (NaN when unknown or hidden)."""
+        nodes = nodes if isinstance(nodes, NodeRegistry) else NodeRegistry.from_frame(nodes)
+        return nodes.latlon(self.node_ids, visible)
+
+    def paths(self, nodes, mode=None, visible=None):
+        """(route_id, name, [(lat, lon), ...]) per route, skipping stops without coordinates."""
+        yx = self.coordinates(nodes, visible)
+        known = ~np.isnan(yx).any(axis=1)
+        result = []
+        for r, route_id in enumerate(self.route_ids):
+            if mode is not None and self.modes[r] != mode:
+                continue
+            stops = self.route_stops[self.route_ptr[r]:self.route_ptr[r + 1]]
+            stops = stops[known[stops]]
+            result.append((route_id, self.names[r], [tuple(p) for p in yx[stops].tolist()]))
+        return result
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+WEIGHT_ATTRS = ("weight", "morning_weight", "evening_weight", "offpeak_weight")
+
+
+def weight_attr(time_period=None):
+    """Edge attribute of a time period: "<period>_weight", or the plain distance "weight" for None."""
+    return "weight" if time_period is None else f"{time_period}_weight"
+
+
+def period_of(attr):
+    """Inverse of weight_attr: the time_period PathFinder takes for a weight attribute."""
+    return None if attr == "weight" else attr[:-len("_weight")]
+
+
+class CSRGraph:
+    """
+    Frozen, array-backed view of an undirected road graph.
+    - node_ids[i] is the original (string) ID of dense node i
+    - neighbors of i are indices[indptr[i]:indptr[i + 1]]
+    - weights[attr] holds one float per stored arc, aligned with indices
+    Every undirected edge is stored once in each direction.
+    """
+
+    def __init__(self, node_ids, indptr, indices, weights, x=None, y=None, version=0):
+        self.node_ids = list(node_ids)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = {attr: np.asarray(w, dtype=np.float64) for attr, w in weights.items()}
+        n = len(self.node_ids)
+        self.x = np.zeros(n) if x is None else np.asarray(x, dtype=np.float64)
+        self.y = np.zeros(n) if y is None else np.asarray(y, dtype=np.float64)
+        self.version = version
+        self._lists = {}
+
+    @classmethod
+    def from_networkx(cls, G, attrs=WEIGHT_ATTRS):
+        # Dense IDs follow the sorted string IDs so (dist, index) heap ties break
+        # exactly like the (dist, node_id) ties of the dict-based searches.
+        node_ids = sorted(G.nodes, key=str)
+        index = {node: i for i, node in enumerate(node_ids)}
+        indptr = [0]
+        indices = []
+        weights = {attr: [] for attr in attrs}
+        for u in node_ids:
+            for v, data in G.adj[u].items():
+                indices.append(index[v])
+                for attr in attrs:
+                    weights[attr].append(data.get(attr, 1))
+            indptr.append(len(indices))
+        x = [G.nodes[n].get("x", 0) for n in node_ids]
+        y = [G.nodes[n].get("y", 0) for n in node_ids]
+        return cls(node_ids, indptr, indices, weights, x=x, y=y,
+                   version=G.graph.get("version", 0))
+
+    @classmethod
+    def of(cls, G):
+        """Frozen view of G, rebuilt only when the graph version changes."""
+        version = G.graph.get("version", 0)
+        cached = G.graph.get("_csr")
+        if cached is None or cached.version != version:
+            cached = cls.from_networkx(G)
+            G.graph["_csr"] = cached
+        return cached
+
+    @classmethod
+    def from_edges(cls, node_ids, from_ids, to_ids, weights, x=None, y=None, version=0):
+        """Vectorized build from parallel endpoint/weight columns (one row per undirected edge)."""
+        node_ids = list(node_ids)
+        lookup = pd.Index(node_ids)
+        u = lookup.get_indexer(pd.Index(from_ids))
+        v = lookup.get_indexer(pd.Index(to_ids))
+        if (u < 0).any() or (v < 0).any():
+            raise KeyError("edge endpoint missing from node_ids")
+        # Arc 2k is u->v and 2k+1 is v->u; a self-loop is stored once, as NetworkX does
+        src = np.column_stack([u, v]).ravel()
+        dst = np.column_stack([v, u]).ravel()
+        keep = np.ones(len(src), dtype=bool)
+        keep[1::2] = u != v
+        order = np.flatnonzero(keep)[np.argsort(src[keep], kind="stable")]
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src[keep], minlength=len(node_ids)), out=indptr[1:])
+        arcs = {attr: np.repeat(np.asarray(w, dtype=np.float64), 2)[order] for attr, w in weights.items()}
+        return cls(node_ids, indptr, dst[order], arcs, x=x, y=y, version=version)
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.indices) // 2
+
+    def weight_array(self, attr):
+        # Mirrors G[u][v].get(attr, 1): unknown attributes weigh 1 per edge
+        if attr not in self.weights:
+            self.weights[attr] = np.ones(len(self.indices))
+        return self.weights[attr]
+
+    def lists(self, attr):
+        """Plain-list copies of (indptr, indices, weights) for the pure-Python search loops."""
+        if attr not in self._lists:
+            self._lists[attr] = (
+                self.indptr.tolist(),
+                self.indices.tolist(),
+                self.weight_array(attr).tolist(),
+            )
+        return self._lists[attr]
+
+    def edge_arrays(self, attr="weight"):
+        """(u, v, w) with one entry per undirected edge (u <= v), in CSR order."""
+        tails = np.repeat(np.arange(self.number_of_nodes()), np.diff(self.indptr))
+        keep = tails <= self.indices
+        return tails[keep], self.indices[keep], self.weight_array(attr)[keep]
+
+    def xy_lists(self):
+        return self.derived("xy", lambda: (self.x.tolist(), self.y.tolist()))
+
+    def derived(self, key, compute):
+        # Memoize a value derived from the (frozen) arrays
+        if key not in self._lists:
+            self._lists[key] = compute()
+        return self._lists[key]
+
+    def patch(self, changes, version):
+        """
+        Overwrite single edge weights in place (both arcs of each EdgeChange) and move to the
+        new graph version; memoized values derived from a patched attribute are dropped.
+        """
+        touched = set()
+        for u, v, attr, _, new in changes:
+            weights = self.weight_array(attr)
+            listed = self._lists.get(attr)
+            for a, b in ((u, v), (v, u)):
+                i, j = self.index[a], self.index[b]
+                start = self.indptr[i]
+                for k in (start + np.flatnonzero(self.indices[start:self.indptr[i + 1]] == j)).tolist():
+                    weights[k] = new
+                    if listed is not None:
+                        listed[2][k] = new
+            touched.add(attr)
+        for key in [k for k in self._lists if isinstance(k, tuple) and touched.intersection(k)]:
+            del self._lists[key]
+        self.version = version
+
+    def neighbors(self, node):
+        i = self.index[node]
+        return [self.node_ids[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
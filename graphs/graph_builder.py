@@ -1,63 +1,208 @@
+import itertools
+from collections import namedtuple
+
 import networkx as nx
+import numpy as np
+import pandas as pd
+from core.node_registry import NodeRegistry
+from graphs.csr_graph import CSRGraph, WEIGHT_ATTRS
+
+EDGE_ATTRS = WEIGHT_ATTRS + ("capacity", "type")
+TRAFFIC_COLUMNS = ["morning_peak_veh_h", "evening_peak_veh_h", "afternoon_veh_h", "night_veh_h"]
+
+# Process-wide so two graphs never share a version token (PathCache keys on it)
+_versions = itertools.count(1)
+
+# One changed edge attribute, as handed to change listeners
+EdgeChange = namedtuple("EdgeChange", ["u", "v", "attr", "old", "new"])
+
 
 class GraphBuilder:
     def __init__(self):
         self.G = nx.Graph()
+        self.listeners = []
+        self.bump_version()
+
+    def bump_version(self):
+        """Mark the graph as changed; caches holding the previous version drop their entries."""
+        self.G.graph["version"] = next(_versions)
+        return self.G.graph["version"]
 
     def build_from_roads(self, existing_df, potential_df=None, coords_df=None, traffic_df=None):
+        # coords_df: a coords table or a NodeRegistry
         if coords_df is not None:
-            for _, row in coords_df.iterrows():
-                self.G.add_node(row["id"], x=row["x"], y=row["y"])
-
-        # Load traffic flow data (road_id = "from-to")
-        traffic_lookup = {}
-        if traffic_df is not None:
-            for _, row in traffic_df.iterrows():
-                parts = str(row["road_id"]).split("-")
-                if len(parts) == 2:
-                    key = (parts[0], parts[1])
-                    traffic_lookup[key] = row
-                    traffic_lookup[(parts[1], parts[0])] = row  # both directions
-
-        def get_weights(from_id, to_id, distance):
-            row = traffic_lookup.get((str(from_id), str(to_id)))
-            if row is not None:
-                base = 1000  # normalize vehicle count to scale weights
-                return {
-                    "morning_weight": distance * (row["morning_peak_veh_h"] / base),
-                    "evening_weight": distance * (row["evening_peak_veh_h"] / base),
-                    "offpeak_weight": distance * ((row["afternoon_veh_h"] + row["night_veh_h"]) / (2 * base))
-                }
-            else:
-                return {
-                    "morning_weight": distance,
-                    "evening_weight": distance,
-                    "offpeak_weight": distance
-                }
-
-        for _, row in existing_df.iterrows():
-            weights = get_weights(row["from_id"], row["to_id"], row["distance_km"])
-            self.G.add_edge(
-                row["from_id"], row["to_id"],
-                weight=row["distance_km"],
-                morning_weight=weights["morning_weight"],
-                evening_weight=weights["evening_weight"],
-                offpeak_weight=weights["offpeak_weight"],
-                capacity=row.get('capacity_veh_h'),
-                type="existing"
-            )
+            nodes = self._registry(coords_df)
+            self.G.add_nodes_from(zip(
+                nodes.ids, ({"x": x, "y": y} for x, y in zip(nodes.x.tolist(), nodes.y.tolist()))
+            ))
+
+        edges = self.road_edges(existing_df, potential_df, traffic_df)
+        self.G.add_edges_from(zip(
+            edges["from_id"], edges["to_id"], edges[list(EDGE_ATTRS)].to_dict("records")
+        ))
+        self.bump_version()
+        return self.G
+
+    def update_edge(self, u, v, **attrs):
+        # Add the road or change its attributes (e.g. new period weights)
+        self.G.add_edge(u, v, **attrs)
+        return self.bump_version()
+
+    def remove_edge(self, u, v):
+        self.G.remove_edge(u, v)
+        return self.bump_version()
+
+    def add_listener(self, callback):
+        """callback(changes, old_version, new_version) runs after every apply_traffic batch."""
+        self.listeners.append(callback)
 
+    def apply_traffic(self, traffic_df):
+        """
+        Recompute the period weights of the roads named in traffic_df (traffic_flow.csv
+        columns; NaN leaves a period as it is) in place, with the same formulas as
+        road_edges. Returns the EdgeChange list; the frozen CSR view is patched and the
+        listeners get the change set instead of a rebuild.
+        """
+        flows = self.traffic_by_direction(traffic_df)
+        base = 1000  # normalize vehicle count to scale weights
+        changes = []
+        seen = set()
+        for (u, v), m, e, aft, night in zip(flows.index, *(flows[c].tolist() for c in [
+            "morning_peak_veh_h", "evening_peak_veh_h", "afternoon_veh_h", "night_veh_h"
+        ])):
+            if (v, u) in seen or not self.G.has_edge(u, v):
+                continue
+            seen.add((u, v))
+            data = self.G[u][v]
+            d = data["weight"]
+            for attr, value in (("morning_weight", d * (m / base)), ("evening_weight", d * (e / base)),
+                                ("offpeak_weight", d * ((aft + night) / (2 * base)))):
+                if value == value and data.get(attr) != value:
+                    changes.append(EdgeChange(u, v, attr, data.get(attr), value))
+                    data[attr] = value
+        if not changes:
+            return changes
+        old = self.G.graph["version"]
+        new = self.bump_version()
+        csr = self.G.graph.get("_csr")
+        if csr is not None and csr.version == old:
+            csr.patch(changes, new)
+        for callback in self.listeners:
+            callback(changes, old, new)
+        return changes
+
+    def build_csr(self, existing_df, potential_df=None, coords_df=None, traffic_df=None):
+        """Same inputs as build_from_roads, loaded straight into a CSRGraph (no NetworkX)."""
+        edges = self.road_edges(existing_df, potential_df, traffic_df)
+        ids = [edges["from_id"], edges["to_id"]]
+        nodes = self._registry(coords_df) if coords_df is not None else None
+        if nodes is not None:
+            ids.insert(0, pd.Series(nodes.ids, dtype=object))
+        node_ids = sorted(pd.unique(pd.concat(ids, ignore_index=True)), key=str)
+        x = y = None
+        if nodes is not None:
+            x, y = (np.nan_to_num(a, nan=0.0) for a in nodes.xy(node_ids))
+        return CSRGraph.from_edges(
+            node_ids, edges["from_id"], edges["to_id"],
+            {attr: edges[attr].to_numpy(dtype=float) for attr in WEIGHT_ATTRS},
+            x=x, y=y, version=next(_versions)
+        )
+
+    def _registry(self, coords):
+        return coords if isinstance(coords, NodeRegistry) else NodeRegistry.from_frame(coords)
+
+    def road_edges(self, existing_df, potential_df=None, traffic_df=None):
+        """
+        One row per undirected road with every edge attribute computed column-wise:
+        weight, morning/evening/offpeak weights (scaled by traffic_flow), capacity, type.
+        Duplicate pairs keep their first position and last attributes (like repeated
+        add_edge calls); an existing road is never overridden by a potential one.
+        """
+        tables = [self._typed(existing_df, "existing")]
         if potential_df is not None:
-            for _, row in potential_df.iterrows():
-                weights = get_weights(row["from_id"], row["to_id"], row["distance_km"])
-                self.G.add_edge(
-                    row["from_id"], row["to_id"],
-                    weight=row["distance_km"],
-                    morning_weight=weights["morning_weight"],
-                    evening_weight=weights["evening_weight"],
-                    offpeak_weight=weights["offpeak_weight"],
-                    capacity=row.get('capacity_veh_h'),
-                    type="potential"
-                )
+            tables.append(self._typed(potential_df, "potential"))
+        roads = pd.concat(tables, ignore_index=True)
+        flows = self.traffic_by_direction(traffic_df) if traffic_df is not None else None
+        return self._edges(roads, flows)
 
-        return self.G
+    def add_roads(self, roads_df, road_type="existing", flows=None):
+        """
+        Add one batch of roads (e.g. a chunk of existing_roads.csv) to the graph, with period
+        weights from flows (traffic_by_direction output). Feeding every existing batch before
+        the potential ones gives the same graph as build_from_roads on the whole tables.
+        """
+        edges = self._edges(self._typed(roads_df, road_type), flows)
+        if road_type != "existing":
+            G = self.G
+            taken = [G.has_edge(u, v) and G[u][v].get("type") == "existing"
+                     for u, v in zip(edges["from_id"], edges["to_id"])]
+            edges = edges[~np.array(taken, dtype=bool)]
+        self.G.add_edges_from(zip(
+            edges["from_id"].tolist(), edges["to_id"].tolist(), edges[list(EDGE_ATTRS)].to_dict("records")
+        ))
+        self.bump_version()
+        return len(edges)
+
+    def _edges(self, roads, flows):
+        a = roads["from_id"].astype(str)
+        b = roads["to_id"].astype(str)
+        roads["lo"] = a.where(a <= b, b)
+        roads["hi"] = b.where(a <= b, a)
+        pair = ["lo", "hi"]
+        is_existing = roads["type"] == "existing"
+        existing_pairs = pd.MultiIndex.from_frame(roads.loc[is_existing, pair])
+        roads = roads[is_existing | ~pd.MultiIndex.from_frame(roads[pair]).isin(existing_pairs)]
+
+        # Endpoints (and so node insertion order) come from the first row of a pair,
+        # attributes from the last one.
+        first = roads.drop_duplicates(pair, keep="first")
+        last = roads.drop_duplicates(pair, keep="last").set_index(pair)
+        edges = last.reindex(pd.MultiIndex.from_frame(first[pair])).reset_index(drop=True)
+        edges["from_id"] = first["from_id"].to_numpy()
+        edges["to_id"] = first["to_id"].to_numpy()
+
+        distance = edges["distance_km"]
+        edges["weight"] = distance
+        for attr in ("morning_weight", "evening_weight", "offpeak_weight"):
+            edges[attr] = distance
+        if flows is not None:
+            keys = pd.MultiIndex.from_arrays([edges["from_id"].astype(str), edges["to_id"].astype(str)])
+            matched = flows.reindex(keys)
+            has = matched["morning_peak_veh_h"].notna().to_numpy()
+            base = 1000  # normalize vehicle count to scale weights
+            d = distance.to_numpy()
+            edges["morning_weight"] = np.where(has, d * (matched["morning_peak_veh_h"].to_numpy() / base), d)
+            edges["evening_weight"] = np.where(has, d * (matched["evening_peak_veh_h"].to_numpy() / base), d)
+            edges["offpeak_weight"] = np.where(
+                has,
+                d * ((matched["afternoon_veh_h"].to_numpy() + matched["night_veh_h"].to_numpy()) / (2 * base)),
+                d
+            )
+        return edges
+
+    def _typed(self, df, road_type):
+        cols = ["from_id", "to_id", "distance_km"]
+        out = df[cols].copy()
+        out["capacity"] = df["capacity_veh_h"].astype(object) if "capacity_veh_h" in df.columns else None
+        out["type"] = road_type
+        return out
+
+    def traffic_by_direction(self, traffic_df):
+        # road_id = "from-to"; each row serves both directions and later rows win
+        both = self.directed_traffic(traffic_df)
+        return both.drop_duplicates(["u", "v"], keep="last").set_index(["u", "v"])[TRAFFIC_COLUMNS]
+
+    def directed_traffic(self, traffic_df):
+        """Every valid traffic row twice, as (u, v) and (v, u), in row order."""
+        parts = traffic_df["road_id"].astype(str).str.split("-")
+        valid = parts.str.len() == 2
+        rows = traffic_df[valid]
+        parts = parts[valid]
+        forward = rows[TRAFFIC_COLUMNS].assign(u=parts.str[0].to_numpy(), v=parts.str[1].to_numpy())
+        backward = rows[TRAFFIC_COLUMNS].assign(u=parts.str[1].to_numpy(), v=parts.str[0].to_numpy())
+        return pd.concat([forward, backward]).sort_index(kind="stable")
+
+    def freeze(self):
+        # Array-backed view of the current graph for PathFinder searches; apply_traffic
+        # patches it in place, any other change rebuilds it on the next freeze
+        return CSRGraph.of(self.G)
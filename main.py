@@ -1,15 +1,15 @@
 from core.data_loader import DataLoader
+from core.node_registry import NodeRegistry
 from graphs.graph_builder import GraphBuilder
 from algorithms.mst_planner import MSTPlanner
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import networkx as nx
 
 def main():
     print("🔄 Loading data...")
     loader = DataLoader()
-    data = loader.load_all()
+    data = loader.load_lazy()  # only the road and coordinate tables are read
 
     print("🧠 Building transportation graph...")
     G = GraphBuilder().build_from_roads(data['existing_roads'], data['potential_roads'])
@@ -21,8 +21,7 @@ def main():
     print(f"✅ MST created with {mst.number_of_edges()} edges")
 
     # Build position dictionary
-    coords = pd.concat([data["neighborhoods"], data["facilities"]])
-    id_to_pos = {row["id"]: (row["x"], row["y"]) for _, row in coords.iterrows()}
+    id_to_pos = dict(NodeRegistry.from_data(data).xy_map())
     missing = [n for n in G.nodes if n not in id_to_pos]
 
     # Warn if any node missing position
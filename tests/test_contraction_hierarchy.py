@@ -0,0 +1,108 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms.contraction_hierarchy import ContractionHierarchy, HierarchyRouter
+from algorithms.path_cache import PathCache
+from algorithms.path_finder import PathFinder
+from graphs.csr_graph import WEIGHT_ATTRS, CSRGraph
+
+PERIODS = ("morning", "evening", "offpeak")
+
+# Few distinct values, so most node pairs have several equal-cost routes
+WEIGHTS = {
+    "int": lambda rng: rng.randint(1, 3),
+    "decimal": lambda rng: rng.choice([0.1, 0.2, 0.3, 0.6, 0.7, 0.9]),
+    "zero": lambda rng: rng.choice([0, 1, 1, 2]),
+}
+
+
+def random_graph(kind, seed, n=30, m=70):
+    rng = random.Random(seed)
+    G = nx.gnm_random_graph(n, m, seed=seed)
+    G = nx.relabel_nodes(G, {v: f"N{v}" for v in G})
+    for u, v in G.edges:
+        for attr in WEIGHT_ATTRS:
+            G[u][v][attr] = WEIGHTS[kind](rng)
+    return G
+
+
+def grid_graph(size, seed):
+    rng = random.Random(seed)
+    G = nx.Graph()
+    for a, b in nx.grid_2d_graph(size, size).edges:
+        w = rng.randint(1, 2)
+        G.add_edge(f"{a[0]}_{a[1]}", f"{b[0]}_{b[1]}", **{attr: w for attr in WEIGHT_ATTRS})
+    return G
+
+
+def assert_same_paths(router, finder, nodes):
+    for s in nodes:
+        for t in nodes:
+            assert router.dijkstra(s, t) == finder.dijkstra(s, t), (s, t)
+            for period in PERIODS:
+                assert router.dijkstra_time_variant(s, t, period) == \
+                    finder.dijkstra_time_variant(s, t, period), (s, t, period)
+
+
+@pytest.mark.parametrize("kind", sorted(WEIGHTS))
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_paths_match_dijkstra_on_ties(kind, seed):
+    csr = CSRGraph.from_networkx(random_graph(kind, seed))
+    assert_same_paths(HierarchyRouter.build(csr), PathFinder(csr, PathCache(0)), csr.node_ids)
+
+
+@pytest.mark.parametrize("kind", sorted(WEIGHTS))
+def test_paths_match_dijkstra_on_small_graphs(kind):
+    # Many small graphs with short witness searches hit the rarer tie shapes
+    for seed in range(40):
+        G = random_graph(kind, seed, n=12, m=12 + seed % 13)
+        csr = CSRGraph.from_networkx(G)
+        ch = ContractionHierarchy.build(csr, witness_settle_limit=1 + seed % 3)
+        finder = PathFinder(csr, PathCache(0))
+        for s in csr.node_ids:
+            for t in csr.node_ids:
+                assert ch.shortest_path(s, t) == finder.dijkstra(s, t), (seed, s, t)
+
+
+def test_paths_match_dijkstra_on_grid():
+    csr = CSRGraph.from_networkx(grid_graph(8, seed=4))
+    assert_same_paths(HierarchyRouter.build(csr), PathFinder(csr, PathCache(0)), csr.node_ids)
+
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_short_witness_searches_keep_paths(limit):
+    G = random_graph("int", seed=5)
+    csr = CSRGraph.from_networkx(G)
+    ch = ContractionHierarchy.build(csr, witness_settle_limit=limit)
+    finder = PathFinder(csr, PathCache(0))
+    for s in csr.node_ids:
+        lengths = nx.single_source_dijkstra_path_length(G, s)
+        for t in csr.node_ids:
+            distance, path = ch.query(s, t)
+            assert (path or [t]) == finder.dijkstra(s, t)
+            assert distance == pytest.approx(lengths.get(t, float('inf')))
+
+
+def test_save_load_round_trip(tmp_path):
+    csr = CSRGraph.from_networkx(random_graph("decimal", seed=6))
+    router = HierarchyRouter.build(csr)
+    router.save(tmp_path / "ch")
+    assert_same_paths(HierarchyRouter.load(tmp_path / "ch"), PathFinder(csr, PathCache(0)), csr.node_ids)
+
+
+def test_load_without_tie_flags(tmp_path):
+    csr = CSRGraph.from_networkx(random_graph("int", seed=7))
+    ch = ContractionHierarchy.build(csr)
+    # Hierarchies saved before tie flags existed
+    np.savez(tmp_path / "old.npz", node_ids=np.array(ch.node_ids), rank=ch.rank,
+             up_indptr=ch.up_indptr, up_indices=ch.up_indices, up_weights=ch.up_weights,
+             up_middle=ch.up_middle, attr=np.array(ch.attr), version=np.array(ch.version))
+    old = ContractionHierarchy.load(tmp_path / "old.npz")
+    assert old.up_tie.all()
+    finder = PathFinder(csr, PathCache(0))
+    for s in csr.node_ids:
+        for t in csr.node_ids:
+            assert old.shortest_path(s, t) == finder.dijkstra(s, t)